@@ -1,6 +1,4 @@
-# import 'Counter' to count term occurrence in a document
 import glob
-from collections import Counter
 
 import numpy as np
 import pandas as pd
@@ -13,22 +11,16 @@ from .incidence_matrix import IncidenceMatrix
 # use inheritance to create 'CountMatrix' since a lot of features are common between the two classes
 class CountMatrix(IncidenceMatrix):
     # same building method but insert count in the matrix instead of ones and zeros
-    def build(self) -> None:
+    def build_counts(self, names: list[str], counts: list[dict[str, int]]) -> None:
         incidence = dict()
-        for doc_num, file_path in enumerate(self.collection):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                words = nltk.word_tokenize(content)
-
-            words_count = Counter(normalize_list(words))
-
+        for doc_num, words_count in enumerate(counts):
             for word, count in words_count.items():
                 if word not in incidence:
                     incidence[word] = np.zeros(self.num_docs, dtype=np.int64)
 
                 incidence[word][doc_num] = count
 
-        self.matrix = pd.DataFrame.from_dict(incidence, orient='index', columns=get_files_names(self.collection))
+        self.matrix = pd.DataFrame.from_dict(incidence, orient='index', columns=names)
         self.matrix.sort_index(inplace=True)
 
     # search using natural language and rank retrieved documents based on term frequency (trivial solution)
@@ -26,24 +26,32 @@ class IncidenceMatrix:
         obj.build()
         return obj
 
+    # create an object from the NDJSON word counts written by TransPale, documents are named by their records
+    @classmethod
+    def from_ndjson(cls, path: str):
+        obj = cls()
+        names, counts = read_ndjson(path)
+        obj.collection = names
+        obj.num_docs = len(names)
+        obj.build_counts(names, counts)
+        return obj
+
     # creat the matrix
     def build(self) -> None:
-        incidence = dict()
-
-        for doc_num, file_path in enumerate(self.collection):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                terms = nltk.word_tokenize(content)
+        self.build_counts(get_files_names(self.collection), [count_terms(path) for path in self.collection])
 
-            terms = set(normalize_list(terms))
+    # creat the matrix from the term counts of every document
+    def build_counts(self, names: list[str], counts: list[dict[str, int]]) -> None:
+        incidence = dict()
 
+        for doc_num, terms in enumerate(counts):
             for term in terms:
                 if term not in incidence:
                     incidence[term] = np.zeros(self.num_docs, dtype=np.int8)  # Add a row of zeros when a new term occurred
 
                 incidence[term][doc_num] = 1
 
-        self.matrix = pd.DataFrame.from_dict(incidence, orient='index', columns=get_files_names(self.collection))
+        self.matrix = pd.DataFrame.from_dict(incidence, orient='index', columns=names)
         self.matrix.sort_index(inplace=True)
 
     # search in the matrix by applying the same preprocessing that used when building on the query
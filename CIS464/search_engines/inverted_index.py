@@ -20,14 +20,22 @@ class InvertedIndex:
         obj.build()
         return obj
 
-    def build(self) -> None:
-        for doc_num, file_path in enumerate(self.collection):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                terms = nltk.word_tokenize(content)
+    # create an object from the NDJSON word counts written by TransPale, documents are named by their records
+    @classmethod
+    def from_ndjson(cls, path: str):
+        obj = cls()
+        names, counts = read_ndjson(path)
+        obj.collection = names
+        obj.doc_names = names
+        obj.num_docs = len(names)
+        obj.build_counts(counts)
+        return obj
 
-            terms = normalize_list(terms)
+    def build(self) -> None:
+        self.build_counts([count_terms(path) for path in self.collection])
 
+    def build_counts(self, counts: list[dict[str, int]]) -> None:
+        for doc_num, terms in enumerate(counts):
             for term in terms:
                 if term not in self.index:
                     self.index[term] = [doc_num]
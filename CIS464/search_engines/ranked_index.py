@@ -1,4 +1,3 @@
-from collections import Counter
 import math
 
 from .utils import *
@@ -6,14 +5,8 @@ from .inverted_index import InvertedIndex
 
 
 class RankedIndex(InvertedIndex):
-    def build(self):
-        for doc_num, file_path in enumerate(self.collection):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                terms = nltk.word_tokenize(content)
-
-            terms = Counter(normalize_list(terms))
-
+    def build_counts(self, counts: list[dict[str, int]]) -> None:
+        for doc_num, terms in enumerate(counts):
             for term, count in terms.items():
                 if term not in self.index:
                     self.index[term] = []
@@ -1,4 +1,6 @@
+import json
 import os
+from collections import Counter
 
 import nltk
 
@@ -102,6 +104,27 @@ def normalize_list(words: list) -> list[str]:
     return [normalize(word) for word in words if word.isalpha()]
 
 
+# read a document and count its normalized terms
+# eg: I was eating and eating -> {i: 1, was: 1, eat: 2, and: 1}
+def count_terms(file_path: str) -> Counter:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return Counter(normalize_list(nltk.word_tokenize(f.read())))
+
+
+# read the word counts TransPale writes to NDJSON, one {"ID", "Name", "Words"} record per line
+# its words are stemmed with the same snowball stemmer as 'normalize', so they can be used as they are
+# eg: {"ID": 0, "Name": "Brother Louie", "Words": {"louie": 12}} -> ['Brother Louie'], [{louie: 12}]
+def read_ndjson(path: str) -> tuple[list[str], list[dict[str, int]]]:
+    names, counts = [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                names.append(record['Name'])
+                counts.append(record['Words'])
+    return names, counts
+
+
 # small formated print for prettier output
 def print_scors(scores: list) -> None:
     print(f'{"Documents:":<30}Scores')
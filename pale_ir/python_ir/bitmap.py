@@ -0,0 +1,50 @@
+from typing import Iterator
+
+
+class Bitmap:
+    """Growable set of small non-negative ints stored one bit per id."""
+
+    def __init__(self) -> None:
+        self._bits: bytearray = bytearray()
+        self._count: int = 0
+
+    @staticmethod
+    def _check(i: int) -> None:
+        if i < 0:
+            raise ValueError(f"Bitmap ids must be non-negative, got {i}")
+
+    def add(self, i: int) -> None:
+        self._check(i)
+        byte, bit = divmod(i, 8)
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(max(byte + 1 - len(self._bits), len(self._bits))))
+        if not self._bits[byte] >> bit & 1:
+            self._bits[byte] |= 1 << bit
+            self._count += 1
+
+    def discard(self, i: int) -> None:
+        if i in self:
+            self._bits[i >> 3] &= ~(1 << (i & 7))
+            self._count -= 1
+
+    def __contains__(self, i: int) -> bool:
+        self._check(i)
+        byte = i >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] >> (i & 7) & 1)
+
+    def __iter__(self) -> Iterator[int]:
+        for byte, value in enumerate(self._bits):
+            if not value:
+                continue
+            for bit in range(8):
+                if value >> bit & 1:
+                    yield byte * 8 + bit
+
+    def __len__(self) -> int:
+        return self._count
+
+    def max(self, default: int = -1) -> int:
+        for byte in range(len(self._bits) - 1, -1, -1):
+            if value := self._bits[byte]:
+                return byte * 8 + value.bit_length() - 1
+        return default
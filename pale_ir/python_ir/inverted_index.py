@@ -3,10 +3,15 @@ import glob
 import os
 import math
 import json
+import threading
 from sortedcontainers import SortedKeyList
-from typing import DefaultDict, List, Tuple, Dict
+from typing import Callable, DefaultDict, Iterable, List, Tuple, Dict, Optional
 
-from document import Document
+from bitmap import Bitmap
+from document import Document, stemmer
+from term_dictionary import TermDictionary
+from snapshot import LazyFrequencies, LazyPostingsIndex, Snapshot, new_postings, write_snapshot
+from wal import WriteAheadLog
 
 
 def precedence(op: str) -> int:
@@ -26,7 +31,7 @@ def infix_to_postfix(expression: str) -> List[str]:
     current_str = ""
 
     for char in expression:
-        if char.isalpha():
+        if char.isalnum():
             current_str += char
         else:
             if current_str:
@@ -34,7 +39,8 @@ def infix_to_postfix(expression: str) -> List[str]:
                 current_str = ""
 
             if char in ['~', '&', '^', '|', '-', '=']:
-                while operators and precedence(operators[-1]) >= precedence(char):
+                # `~` is unary and right associative: it can't pop a pending `~`, or `~~a` loses its operand
+                while char != '~' and operators and precedence(operators[-1]) >= precedence(char):
                     output.append(operators.pop())
                 operators.append(char)
             elif char == '(':
@@ -45,7 +51,7 @@ def infix_to_postfix(expression: str) -> List[str]:
                 if not operators:
                     raise ValueError("Unbalanced parentheses")
                 operators.pop()
-            else:
+            elif not char.isspace():
                 raise Exception(f"Invalid expression: {expression}, Nuh uh")
 
     if current_str:
@@ -59,40 +65,292 @@ def infix_to_postfix(expression: str) -> List[str]:
     return output
 
 
+# Merge based set algebra over sorted doc id lists, each runs in O(len(a) + len(b))
+
+def intersect(a: List[int], b: List[int]) -> List[int]:
+    rizz = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            i += 1
+        elif a[i] > b[j]:
+            j += 1
+        else:
+            rizz.append(a[i])
+            i += 1
+            j += 1
+    return rizz
+
+
+def union(a: List[int], b: List[int]) -> List[int]:
+    rizz = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            rizz.append(a[i])
+            i += 1
+        elif a[i] > b[j]:
+            rizz.append(b[j])
+            j += 1
+        else:
+            rizz.append(a[i])
+            i += 1
+            j += 1
+    rizz.extend(a[i:])
+    rizz.extend(b[j:])
+    return rizz
+
+
+def difference(a: List[int], b: List[int]) -> List[int]:
+    rizz = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            rizz.append(a[i])
+            i += 1
+        elif a[i] > b[j]:
+            j += 1
+        else:
+            i += 1
+            j += 1
+    rizz.extend(a[i:])
+    return rizz
+
+
+def symmetric_difference(a: List[int], b: List[int]) -> List[int]:
+    rizz = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            rizz.append(a[i])
+            i += 1
+        elif a[i] > b[j]:
+            rizz.append(b[j])
+            j += 1
+        else:
+            i += 1
+            j += 1
+    rizz.extend(a[i:])
+    rizz.extend(b[j:])
+    return rizz
+
+
+# Binary operators of `infix_to_postfix` as functions of (left, right, all documents)
+BOOLEAN_OPS: Dict[str, Callable[[List[int], List[int], List[int]], List[int]]] = {
+    '&': lambda a, b, universe: intersect(a, b),
+    '|': lambda a, b, universe: union(a, b),
+    '^': lambda a, b, universe: symmetric_difference(a, b),
+    '-': lambda a, b, universe: difference(universe, difference(a, b)),  # a -> b is ~(a & ~b)
+    '=': lambda a, b, universe: difference(universe, symmetric_difference(a, b)),
+}
+
+
 class InvertedIndex:
     def __init__(self) -> None:
         self.documents_map: Dict[int, str] = {}
-        self.stem_index: DefaultDict[str, SortedKeyList[Tuple[int, int]]] = defaultdict(
-                lambda: SortedKeyList(key=lambda x: x[0])
-        )
-        self.word_index: DefaultDict[str, SortedKeyList[Tuple[int, int]]] = defaultdict(
-                lambda: SortedKeyList(key=lambda x: x[0])
-        )
+        self.stem_index: DefaultDict[str, SortedKeyList[Tuple[int, int]]] = defaultdict(new_postings)
+        self.word_index: DefaultDict[str, SortedKeyList[Tuple[int, int]]] = defaultdict(new_postings)
         self.doc_frequencies: Dict[str, int] = {}  # To store document frequency of each term
+        self.tombstones: Bitmap = Bitmap()  # Deleted documents whose postings haven't been purged yet
+        # (stems, words) of the documents added since the snapshot; the snapshot keeps its own
+        self._doc_terms: Dict[int, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        self._snapshot: Optional[Snapshot] = None
+        self._wal: Optional[WriteAheadLog] = None
+        self._snapshot_path: Optional[str] = None
+        self.compact_every: int = 0
+        self._term_dictionary: Optional[TermDictionary] = None
+        # Always taken in this order: _compaction_lock, then _lock
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.RLock()
 
     def add_document(self, doc: Document) -> None:
         doc_id = doc.get_id()
-        self.documents_map[doc_id] = doc.path
 
-        for word, count in doc.word_counter.items():
+        with self._lock:
+            if doc_id in self.documents_map:
+                raise ValueError(f"Document id {doc_id} is already taken by {self.documents_map[doc_id]}")
+
+            self._add(doc_id, doc.path, doc.word_counter, doc.stem_counter)
+            self._log({
+                "op":    "add",
+                "id":    doc_id,
+                "path":  doc.path,
+                "words": doc.word_counter,
+                "stems": doc.stem_counter,
+            })
+
+    def delete_document(self, doc_id: int) -> None:
+        """
+        Remove a document from query results right away.
+
+        Its postings are only marked in `tombstones`; `compact` (or
+        `compact_in_background`) drops them and fixes the document frequencies.
+        """
+        with self._lock:
+            if doc_id not in self.documents_map:
+                raise KeyError(f"No document with id {doc_id}")
+
+            self._delete(doc_id)
+            self._log({"op": "remove", "id": doc_id})
+
+    def update_document(self, doc: Document) -> None:
+        """Replace the document stored under `doc.get_id()` with `doc`."""
+        with self._compaction_lock, self._lock:
+            self.delete_document(doc.get_id())
+            self.add_document(doc)
+
+    def next_doc_id(self) -> int:
+        """Smallest id that is safe to give a new document."""
+        return max(max(self.documents_map, default=-1), self.tombstones.max()) + 1
+
+    def _add(self, doc_id: int, path: str, word_counter: Dict[str, int], stem_counter: Dict[str, int]) -> None:
+        if doc_id in self.tombstones:
+            # Reusing a deleted id: its old postings have to go before the new ones share the id
+            self._purge_document(doc_id)
+
+        self.documents_map[doc_id] = path
+        self._doc_terms[doc_id] = (tuple(stem_counter), tuple(word_counter))
+
+        if self._term_dictionary is not None:
+            for word in word_counter:
+                self._term_dictionary.add(word)
+
+        for word, count in word_counter.items():
             self.word_index[word].add((doc_id, count))
             self.doc_frequencies[word] = self.doc_frequencies.get(word, 0) + 1
 
-        for stem, count in doc.stem_counter.items():
+        for stem, count in stem_counter.items():
             self.stem_index[stem].add((doc_id, count))
             self.doc_frequencies[stem] = self.doc_frequencies.get(stem, 0) + 1
 
+    def _delete(self, doc_id: int) -> None:
+        del self.documents_map[doc_id]
+        self.tombstones.add(doc_id)
+
+    def _terms_of(self, doc_id: int) -> Tuple[Iterable[str], Iterable[str]]:
+        """(stems, words) a document has postings under."""
+        if doc_id in self._doc_terms:
+            return self._doc_terms[doc_id]
+        if self._snapshot is not None and (terms := self._snapshot.doc_terms(doc_id)) is not None:
+            return terms
+        return (), ()
+
+    def _purge_document(self, doc_id: int) -> None:
+        """Drop every posting of a tombstoned document, touching only the terms it has."""
+        stems, words = self._terms_of(doc_id)
+        self._purge(self.stem_index, stems, doc_id)
+        self._purge(self.word_index, words, doc_id)
+        self.tombstones.discard(doc_id)
+        self._doc_terms.pop(doc_id, None)
+
+    def _purge(self, index: Dict[str, SortedKeyList], terms: Iterable[str], doc_id: int) -> None:
+        """Drop the postings of `doc_id` under `terms`, dropping terms that end up empty."""
+        for term in terms:
+            postings = index.get(term)
+            if postings is None:
+                continue
+
+            stale = list(postings.irange_key(doc_id, doc_id))
+            for posting in stale:
+                postings.remove(posting)
+                self.doc_frequencies[term] -= 1
+
+            if not postings:
+                del index[term]
+                if index is self.word_index and self._term_dictionary is not None:
+                    self._term_dictionary.discard(term)
+            if stale and self.doc_frequencies[term] <= 0:
+                del self.doc_frequencies[term]
+
+    def compact(self) -> None:
+        """
+        Purge the postings of every tombstoned document.
+
+        Only the terms of those documents are visited, and the lock is taken one
+        document at a time, so searches and new documents can keep going while
+        this runs on another thread.
+        """
+        with self._compaction_lock:
+            with self._lock:
+                doc_ids = list(self.tombstones)
+
+            for doc_id in doc_ids:
+                with self._lock:
+                    # Skip ids that were reused (and so purged) since we looked
+                    if doc_id in self.tombstones:
+                        self._purge_document(doc_id)
+
+    def compact_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.compact, name="pale-ir-compaction", daemon=True)
+        thread.start()
+        return thread
+
+    def _log(self, record: Dict) -> None:
+        if self._wal is None:
+            return
+
+        self._wal.append(record)
+        if self.compact_every and self._wal.records >= self.compact_every:
+            self.checkpoint()
+
+    def _replay(self, record: Dict) -> None:
+        if record["op"] == "add":
+            # The snapshot may already hold it if we died between writing the snapshot and truncating the log
+            if self.documents_map.get(record["id"]) == record["path"]:
+                return
+            self._add(record["id"], record["path"], record["words"], record["stems"])
+        elif record["op"] == "remove":
+            if record["id"] in self.documents_map:
+                self._delete(record["id"])
+        else:
+            raise ValueError(f"Unknown log record: {record['op']}")
+
     def from_folder(self, folder: str) -> None:
         for file in glob.glob(os.path.join(folder, "*.txt")):
-            doc = Document(file, len(self.documents_map))
+            doc = Document(file, self.next_doc_id())
             self.add_document(doc)
 
-    def search(self, query: str) -> List[Tuple[int, float]]:
+    @property
+    def term_dictionary(self) -> TermDictionary:
+        """Sorted vocabulary of `word_index`, built on first use and kept in sync afterwards."""
+        with self._lock:
+            if self._term_dictionary is None:
+                self._term_dictionary = TermDictionary(self.word_index)
+            return self._term_dictionary
+
+    def expand(self, term: str, max_edits: int = 0) -> List[str]:
+        """
+        Indexed words a query term stands for.
+
+        `*` and `?` make it a wildcard (`lov*` is a prefix search), otherwise a
+        word missing from the index also stands for the words within `max_edits`
+        edits of it. The term itself is always kept, so its stem still matches.
+        """
+        if '*' in term or '?' in term:
+            return self.term_dictionary.wildcard(term)
+        if max_edits <= 0 or term in self.word_index:
+            return [term]
+        return [term] + [word for word, _ in self.term_dictionary.fuzzy(term, max_edits)]
+
+    def search(self, query: str, where: Optional[str] = None, max_edits: int = 0) -> List[Tuple[int, float]]:
+        """
+        Rank documents for a bag-of-words `query`.
+
+        `where` is an optional boolean expression (see `boolean_search`); when
+        given, only the documents it matches are scored. Query words may be
+        wildcards, and misspelled ones are expanded when `max_edits` > 0.
+        """
         query = query.lower()
 
-        # Separate search for stem and word
-        stem_results = self._search_for_terms(Document.compute_stem_counter(query.split()), use_stem=True)
-        word_results = self._search_for_terms(Counter(query.split()), use_stem=False)
+        with self._lock:
+            candidates = self.boolean_search(where) if where is not None else None
+            query = " ".join(word for term in query.split() for word in self.expand(term, max_edits))
+
+            # Separate search for stem and word
+            stem_results = self._search_for_terms(
+                    Document.compute_stem_counter(query.split()), use_stem=True, candidates=candidates
+            )
+            word_results = self._search_for_terms(Counter(query.split()), use_stem=False, candidates=candidates)
 
         # Combine the results by adding the scores
         combined_scores: Dict[int, float] = defaultdict(float)
@@ -107,32 +365,126 @@ class InvertedIndex:
 
         return sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
 
-    def _search_for_terms(self, query_terms: Dict[str, int], use_stem: bool) -> List[Tuple[int, float]]:
+    def _search_for_terms(
+            self, query_terms: Dict[str, int], use_stem: bool, candidates: Optional[List[int]] = None
+    ) -> List[Tuple[int, float]]:
         """Helper method to search for individual terms in the index."""
         index = self.stem_index if use_stem else self.word_index
         num_docs = len(self.documents_map)
         scores: Dict[int, float] = defaultdict(float)
 
         for term, query_count in query_terms.items():
-            if term not in self.doc_frequencies:
+            # .get, not [], so probing a missing term doesn't leave an empty posting list behind
+            postings = index.get(term)
+            if not postings or term not in self.doc_frequencies:
                 continue  # Skip terms that don't exist in the index
 
-            df = self.doc_frequencies[term]
+            df = self._frequency(term)
             idf = math.log((num_docs + 1) / (df + 1)) + 1  # Smoothed IDF
 
-            for doc_id, term_freq in index[term]:
+            for doc_id, term_freq in self._filtered(postings, candidates):
+                if doc_id in self.tombstones:
+                    continue  # Deleted, waiting for compaction
+
                 tf = 1 + math.log(term_freq)  # Log-scaled TF
                 scores[doc_id] += tf * idf * query_count
 
         return sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
+    def _frequency(self, term: str) -> int:
+        """Document frequency of `term`, leaving out deleted documents compaction hasn't purged yet."""
+        df = self.doc_frequencies[term]
+        if not self.tombstones:
+            return df
+
+        for index in (self.stem_index, self.word_index):
+            postings = index.get(term)
+            if not postings:
+                continue
+            # Same trade-off as _filtered: look each tombstone up, or walk the postings once
+            if len(self.tombstones) * 8 < len(postings):
+                df -= sum(1 for doc_id in self.tombstones for _ in postings.irange_key(doc_id, doc_id))
+            else:
+                df -= sum(1 for doc_id, _ in postings if doc_id in self.tombstones)
+        return df
+
+    @staticmethod
+    def _filtered(postings: SortedKeyList, candidates: Optional[List[int]]) -> Iterable[Tuple[int, int]]:
+        """Postings restricted to the sorted `candidates`, touching as few of them as possible."""
+        if candidates is None:
+            return postings
+
+        # Few candidates: look each one up; otherwise walk the postings once
+        if len(candidates) * 8 < len(postings):
+            return (posting for doc_id in candidates for posting in postings.irange_key(doc_id, doc_id))
+
+        wanted = set(candidates)
+        return (posting for posting in postings if posting[0] in wanted)
+
+    def boolean_search(self, expression: str) -> List[int]:
+        """
+        Sorted ids of the documents matching a boolean expression.
+
+        Operands are matched on their stem. Operators, loosest binding last:
+        `~` not, `&` and, `^` xor, `|` or, `-` implication, `=` equivalence.
+        eg: love & ~(baby | girl)
+        """
+        with self._lock:
+            universe: List[int] = []
+            stack: List[List[int]] = []
+
+            for token in infix_to_postfix(expression.lower()):
+                if token == '~' or token in BOOLEAN_OPS:
+                    if not universe:
+                        universe = sorted(self.documents_map)
+                    try:
+                        right = stack.pop()
+                        if token == '~':
+                            stack.append(difference(universe, right))
+                        else:
+                            stack.append(BOOLEAN_OPS[token](stack.pop(), right, universe))
+                    except IndexError:
+                        raise ValueError(f"Invalid expression: {expression}, Nuh uh") from None
+                else:
+                    stack.append(self._doc_ids(stemmer.stem(token)))
+
+            if len(stack) != 1:
+                raise ValueError(f"Invalid expression: {expression}, Nuh uh")
+            return stack[0]
+
+    def _doc_ids(self, stem: str) -> List[int]:
+        postings = self.stem_index.get(stem) or ()
+        return [doc_id for doc_id, _ in postings if doc_id not in self.tombstones]
+
+    def _live(self) -> Tuple[Dict[str, int], Dict[str, List[Tuple[int, int]]], Dict[str, List[Tuple[int, int]]]]:
+        """Frequencies, stem and word postings with tombstoned documents left out, for exporting."""
+        doc_frequencies = dict(self.doc_frequencies.items())
+        indexes = []
+        for index in (self.stem_index, self.word_index):
+            live = {}
+            for term, postings in index.items():
+                if not self.tombstones:
+                    live[term] = postings
+                    continue
+
+                kept = [posting for posting in postings if posting[0] not in self.tombstones]
+                doc_frequencies[term] -= len(postings) - len(kept)
+                if kept:
+                    live[term] = kept
+            indexes.append(live)
+
+        doc_frequencies = {term: df for term, df in doc_frequencies.items() if df > 0}
+        return doc_frequencies, indexes[0], indexes[1]
+
     def save_to_json(self, file_path: str) -> None:
-        data = {
-            "documents_map":   {str(k): v for k, v in self.documents_map.items()},  # Convert keys to strings
-            "stem_index":      {k: list(v) for k, v in self.stem_index.items()},  # Convert SortedKeyList to list
-            "word_index":      {k: list(v) for k, v in self.word_index.items()},
-            "doc_frequencies": self.doc_frequencies,
-        }
+        with self._lock:
+            doc_frequencies, stem_index, word_index = self._live()
+            data = {
+                "documents_map":   {str(k): v for k, v in self.documents_map.items()},  # Convert keys to strings
+                "stem_index":      {k: list(v) for k, v in stem_index.items()},  # Convert SortedKeyList to list
+                "word_index":      {k: list(v) for k, v in word_index.items()},
+                "doc_frequencies": doc_frequencies,
+            }
         with open(file_path, "w", encoding="utf-8") as file:
             json.dump(data, file, ensure_ascii=False, indent=4)
 
@@ -142,23 +494,115 @@ class InvertedIndex:
             data = json.load(file)
 
         instance = cls()
-        instance.documents_map = data["documents_map"]
+        instance.documents_map = {int(k): v for k, v in data["documents_map"].items()}
         instance.stem_index = defaultdict(
-                lambda: SortedKeyList(key=lambda x: x[0]),
-                {k: SortedKeyList(v, key=lambda x: x[0]) for k, v in data["stem_index"].items()}
+                new_postings,
+                {k: new_postings(map(tuple, v)) for k, v in data["stem_index"].items()}
         )
         instance.word_index = defaultdict(
-                lambda: SortedKeyList(key=lambda x: x[0]),
-                {k: SortedKeyList(v, key=lambda x: x[0]) for k, v in data["word_index"].items()}
+                new_postings,
+                {k: new_postings(map(tuple, v)) for k, v in data["word_index"].items()}
         )
         instance.doc_frequencies = data["doc_frequencies"]
+
+        # The JSON has no per document term lists, rebuild them so deleted ids can be reused cheaply
+        terms: Dict[int, Tuple[List[str], List[str]]] = {}
+        for side, name in enumerate(("stem_index", "word_index")):
+            for term, postings in data[name].items():
+                for doc_id, _ in postings:
+                    terms.setdefault(doc_id, ([], []))[side].append(term)
+        instance._doc_terms = {doc_id: (tuple(stems), tuple(words)) for doc_id, (stems, words) in terms.items()}
         return instance
 
-    def get_doc(self, doc_id: str) -> str:
-        if x := self.documents_map.get(doc_id):
-            return x
+    def save_to_snapshot(self, file_path: str) -> None:
+        """Write the index in the compact binary format read by `load_from_snapshot`."""
+        with self._lock:
+            write_snapshot(file_path, self.documents_map, *self._live())
+
+    @classmethod
+    def load_from_snapshot(cls, file_path: str) -> "InvertedIndex":
+        """
+        Open a binary snapshot without decoding it.
+
+        The file is memory-mapped and posting lists are only unpacked the first
+        time a query (or `add_document`) touches their term.
+        """
+        instance = cls()
+        instance._attach(Snapshot(file_path))
+        return instance
+
+    def _attach(self, snapshot: Snapshot) -> None:
+        """Serve the index straight from `snapshot`, dropping whatever was held in memory."""
+        self._snapshot = snapshot
+        self.documents_map = snapshot.documents()
+        self.stem_index = LazyPostingsIndex(snapshot, "stem_index")
+        self.word_index = LazyPostingsIndex(snapshot, "word_index")
+        self.doc_frequencies = LazyFrequencies(snapshot)
+        self.tombstones = Bitmap()  # Snapshots only hold live documents
+        self._doc_terms = {}  # And know the terms of each of them
+        self._term_dictionary = None
+
+    @classmethod
+    def open(cls, snapshot_path: str, log_path: str, compact_every: int = 1000, sync: bool = False) -> "InvertedIndex":
+        """
+        Load `snapshot_path` (if it exists) and replay the changes recorded in `log_path` on top of it.
+
+        From then on every `add_document` is appended to the log, so persisting
+        a new document only costs writing that document. Once the log holds
+        `compact_every` records it is folded into a fresh snapshot (0 disables that).
+        """
+        instance = cls.load_from_snapshot(snapshot_path) if os.path.exists(snapshot_path) else cls()
+        instance._snapshot_path = snapshot_path
+        instance.compact_every = compact_every
+        instance._wal = WriteAheadLog(log_path, sync=sync)
+
+        for record in instance._wal.replay():
+            instance._replay(record)
+        return instance
 
-        return self.documents_map.get(str(doc_id))
+    def checkpoint(self) -> None:
+        """
+        Write the whole index to its snapshot and start an empty log.
+
+        The new snapshot is written from the current view, which may still read
+        from the old one, and then mapped in its place like `load_from_snapshot`
+        does, so memory goes back to only what queries touch.
+        """
+        if self._snapshot_path is None:
+            raise ValueError("checkpoint() needs an index created with InvertedIndex.open")
+
+        with self._lock:
+            new_path = f"{self._snapshot_path}.new"
+            self.save_to_snapshot(new_path)
+            # A mapped file can't be replaced on every platform, so release the old one first
+            if self._snapshot is not None:
+                self._snapshot.close()
+            os.replace(new_path, self._snapshot_path)
+            self._attach(Snapshot(self._snapshot_path))
+            if self._wal is not None:
+                self._wal.truncate()
+
+    def _detach(self) -> None:
+        """Decode whatever is still on disk and release the snapshot file."""
+        if self._snapshot is None:
+            return
+
+        for index in (self.stem_index, self.word_index, self.doc_frequencies):
+            index.materialize()
+        for doc_id in [*self.documents_map, *self.tombstones]:
+            if doc_id not in self._doc_terms and (terms := self._snapshot.doc_terms(doc_id)) is not None:
+                self._doc_terms[doc_id] = tuple(terms[0]), tuple(terms[1])
+        self._snapshot.close()
+        self._snapshot = None
+
+    def close(self) -> None:
+        self._detach()
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+
+    def get_doc(self, doc_id: int) -> str:
+        return self.documents_map.get(doc_id)
 
     def print_scores(self, scores: list[Tuple[int, float]], file=None) -> None:
         for doc_id, score in scores:
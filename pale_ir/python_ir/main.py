@@ -1,3 +1,5 @@
+import os
+
 from document import Document
 from inverted_index import InvertedIndex
 
@@ -8,20 +10,26 @@ from inverted_index import InvertedIndex
 
 output_file = open('result.txt', 'w')
 
-loaded_index = InvertedIndex.load_from_json('inverted_index.json')
+# The JSON dump stays the export format, the binary snapshot is what we start from
+if not os.path.exists('inverted_index.bin'):
+    InvertedIndex.load_from_json('inverted_index.json').save_to_snapshot('inverted_index.bin')
+
+# New documents only get appended to the log, the snapshot is rewritten every 1000 changes
+loaded_index = InvertedIndex.open('inverted_index.bin', 'inverted_index.wal', compact_every=1000)
 
 rizz = loaded_index.search('love')
 
 print("Query for 'love':", file=output_file)
 loaded_index.print_scores(rizz, file=output_file)
 
-new_doc0 = Document("Don\'t Call Tonight.txt", 117)
-new_doc1 = Document('Let It Happen.txt', 17)
-
-loaded_index.add_document(new_doc0)
-loaded_index.add_document(new_doc1)
+# Ids come from the index itself, a hand-picked one could collide with an existing document
+for path in ("Don\'t Call Tonight.txt", 'Let It Happen.txt'):
+    if path not in loaded_index.documents_map.values():
+        loaded_index.add_document(Document(path, loaded_index.next_doc_id()))
 
 new_rizz = loaded_index.search('happen')
 
 print("Query for 'let':", file=output_file)
 loaded_index.print_scores(new_rizz, file=output_file)
+
+loaded_index.close()
@@ -0,0 +1,361 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sortedcontainers import SortedKeyList
+
+
+# Layout of a snapshot file (all integers little-endian):
+#
+#   header     MAGIC, then one (offset, count) pair per section
+#   documents  count x (doc_id u32, path_offset u32, path_len u32) + utf-8 path blob
+#   tables     count x (term_offset u32, term_len u32, a u32, b u32) + utf-8 term blob
+#   postings   packed u32 (doc_id, count) pairs
+#   doc_terms  count x (doc_id u32, offset u32, stems u32, words u32) + packed u32 table rows
+#
+# Term tables are sorted by their utf-8 bytes so a term can be found with a
+# binary search straight on the mapped file. For the posting tables (a, b) is
+# (offset, number of postings); for the frequency table a is the frequency.
+# doc_terms is sorted by doc id and lists the rows of the stem and word tables
+# each document appears in, so its postings can be dropped without a full scan.
+
+MAGIC = b"PALEIDX2"
+SECTIONS = ("documents", "doc_frequencies", "stem_index", "word_index", "postings", "doc_terms")
+
+HEADER = struct.Struct("<" + "QQ" * len(SECTIONS))
+ENTRY = struct.Struct("<IIII")
+DOC_ENTRY = struct.Struct("<III")
+
+posting_key = itemgetter(0)
+
+
+def new_postings(postings=()) -> SortedKeyList:
+    return SortedKeyList(postings, key=posting_key)
+
+
+def _pack_u32(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array("I", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack_u32(data: bytes) -> array:
+    values = array("I")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _pack_table(rows: List[Tuple[bytes, int, int]]) -> bytes:
+    """Pack sorted (term, a, b) rows into an entry table followed by the term blob."""
+    entries = bytearray()
+    blob = bytearray()
+    base = len(rows) * ENTRY.size
+    for term, a, b in rows:
+        entries += ENTRY.pack(base + len(blob), len(term), a, b)
+        blob += term
+    return bytes(entries + blob)
+
+
+def write_snapshot(
+        file_path: str,
+        documents_map: Dict[int, str],
+        doc_frequencies: Dict[str, int],
+        stem_index: Dict[str, Sequence[Tuple[int, int]]],
+        word_index: Dict[str, Sequence[Tuple[int, int]]],
+) -> None:
+    """Write the documents map, frequencies and both posting indexes as one binary file."""
+    sections: Dict[str, bytes] = {}
+    counts: Dict[str, int] = {}
+
+    docs = sorted(documents_map.items())
+    entries = bytearray()
+    blob = bytearray()
+    for doc_id, path in docs:
+        encoded = path.encode("utf-8")
+        entries += DOC_ENTRY.pack(doc_id, len(docs) * DOC_ENTRY.size + len(blob), len(encoded))
+        blob += encoded
+    sections["documents"] = bytes(entries + blob)
+    counts["documents"] = len(docs)
+
+    frequencies = sorted((term.encode("utf-8"), df, 0) for term, df in doc_frequencies.items())
+    sections["doc_frequencies"] = _pack_table(frequencies)
+    counts["doc_frequencies"] = len(frequencies)
+
+    packed = array("I")
+    doc_terms: Dict[int, Tuple[array, array]] = {doc_id: (array("I"), array("I")) for doc_id, _ in docs}
+    for side, (name, index) in enumerate((("stem_index", stem_index), ("word_index", word_index))):
+        rows = []
+        for term, postings in sorted(index.items()):
+            if not postings:
+                continue
+            rows.append((term.encode("utf-8"), len(packed) * 4, len(postings), postings))
+            for doc_id, count in postings:
+                packed.append(doc_id)
+                packed.append(count)
+        rows.sort(key=itemgetter(0))
+        for row, (_, _, _, postings) in enumerate(rows):
+            for doc_id, _ in postings:
+                doc_terms.setdefault(doc_id, (array("I"), array("I")))[side].append(row)
+        sections[name] = _pack_table([row[:3] for row in rows])
+        counts[name] = len(rows)
+
+    sections["postings"] = _pack_u32(packed)
+    counts["postings"] = len(packed) // 2
+
+    entries = bytearray()
+    rows_of = array("I")
+    base = len(doc_terms) * ENTRY.size
+    for doc_id, (stems, words) in sorted(doc_terms.items()):
+        entries += ENTRY.pack(doc_id, base + len(rows_of) * 4, len(stems), len(words))
+        rows_of.extend(stems)
+        rows_of.extend(words)
+    sections["doc_terms"] = bytes(entries) + _pack_u32(rows_of)
+    counts["doc_terms"] = len(doc_terms)
+
+    header = [MAGIC]
+    layout = []
+    offset = len(MAGIC) + HEADER.size
+    for name in SECTIONS:
+        layout.extend((offset, counts[name]))
+        offset += len(sections[name])
+    header.append(HEADER.pack(*layout))
+
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.writelines(header)
+        file.writelines(sections[name] for name in SECTIONS)
+    os.replace(tmp_path, file_path)
+
+
+class Snapshot:
+    """Read-only view over a snapshot file; terms and postings are decoded on demand."""
+
+    def __init__(self, file_path: str) -> None:
+        self.path = file_path
+        self._file = open(file_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a pale_ir snapshot: {file_path}")
+
+        layout = HEADER.unpack_from(self._map, len(MAGIC))
+        self._sections: Dict[str, Tuple[int, int]] = {
+            name: (layout[2 * i], layout[2 * i + 1]) for i, name in enumerate(SECTIONS)
+        }
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def documents(self) -> Dict[int, str]:
+        offset, count = self._sections["documents"]
+        rizz: Dict[int, str] = {}
+        for i in range(count):
+            doc_id, path_offset, path_len = DOC_ENTRY.unpack_from(self._map, offset + i * DOC_ENTRY.size)
+            start = offset + path_offset
+            rizz[doc_id] = self._map[start:start + path_len].decode("utf-8")
+        return rizz
+
+    def table_size(self, section: str) -> int:
+        return self._sections[section][1]
+
+    def _entry(self, section: str, i: int) -> Tuple[bytes, int, int]:
+        offset, _ = self._sections[section]
+        term_offset, term_len, a, b = ENTRY.unpack_from(self._map, offset + i * ENTRY.size)
+        start = offset + term_offset
+        return self._map[start:start + term_len], a, b
+
+    def lookup(self, section: str, term: str) -> Optional[Tuple[int, int]]:
+        """Binary search `term` in a table, returning its (a, b) values or None."""
+        target = term.encode("utf-8")
+        lo, hi = 0, self.table_size(section)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, a, b = self._entry(section, mid)
+            if key < target:
+                lo = mid + 1
+            elif key > target:
+                hi = mid
+            else:
+                return a, b
+        return None
+
+    def terms(self, section: str) -> Iterator[str]:
+        for i in range(self.table_size(section)):
+            yield self._entry(section, i)[0].decode("utf-8")
+
+    def items(self, section: str) -> Iterator[Tuple[str, int, int]]:
+        for i in range(self.table_size(section)):
+            key, a, b = self._entry(section, i)
+            yield key.decode("utf-8"), a, b
+
+    def postings(self, offset: int, length: int) -> List[Tuple[int, int]]:
+        start = self._sections["postings"][0] + offset
+        values = _unpack_u32(self._map[start:start + length * 8])
+        return list(zip(values[0::2], values[1::2]))
+
+    def doc_terms(self, doc_id: int) -> Optional[Tuple[List[str], List[str]]]:
+        """The stems and words document `doc_id` has postings under, or None if it isn't in the file."""
+        offset, count = self._sections["doc_terms"]
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, rows_offset, stems, words = ENTRY.unpack_from(self._map, offset + mid * ENTRY.size)
+            if key < doc_id:
+                lo = mid + 1
+            elif key > doc_id:
+                hi = mid
+            else:
+                start = offset + rows_offset
+                rows = _unpack_u32(self._map[start:start + (stems + words) * 4])
+                return (
+                    [self._entry("stem_index", row)[0].decode("utf-8") for row in rows[:stems]],
+                    [self._entry("word_index", row)[0].decode("utf-8") for row in rows[stems:]],
+                )
+        return None
+
+
+class LazyPostingsIndex(dict):
+    """
+    Term -> SortedKeyList mapping backed by a snapshot.
+
+    Posting lists stay packed in the mapped file until a term is first looked
+    up; unknown terms get an empty list, like the defaultdict it replaces.
+    """
+
+    def __init__(self, snapshot: Snapshot, section: str) -> None:
+        super().__init__()
+        self._snapshot: Optional[Snapshot] = snapshot
+        self._section = section
+        self._dropped: Set[str] = set()  # Deleted terms the snapshot still holds
+
+    def _on_disk(self, term: str) -> Optional[Tuple[int, int]]:
+        if self._snapshot is None or term in self._dropped:
+            return None
+        return self._snapshot.lookup(self._section, term)
+
+    def __delitem__(self, term: str) -> None:
+        if term not in self:
+            raise KeyError(term)
+        self.pop(term, None)
+        if self._snapshot is not None:
+            self._dropped.add(term)
+
+    def __missing__(self, term: str) -> SortedKeyList:
+        found = self._on_disk(term)
+        postings = new_postings(self._snapshot.postings(*found) if found else ())
+        self[term] = postings
+        return postings
+
+    def __contains__(self, term) -> bool:
+        return dict.__contains__(self, term) or self._on_disk(term) is not None
+
+    def get(self, term, default=None):
+        return self[term] if term in self else default
+
+    def _unloaded(self) -> Iterator[str]:
+        if self._snapshot is None:
+            return iter(())
+        return (
+            term for term in self._snapshot.terms(self._section)
+            if not dict.__contains__(self, term) and term not in self._dropped
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        yield from dict.__iter__(self)
+        yield from self._unloaded()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(term, self[term]) for term in list(self)]
+
+    def values(self):
+        return [postings for _, postings in self.items()]
+
+    def materialize(self) -> None:
+        """Decode every remaining term and detach from the snapshot."""
+        for term in list(self._unloaded()):
+            self[term]
+        self._snapshot = None
+        self._dropped.clear()
+
+
+class LazyFrequencies(dict):
+    """Term -> document frequency mapping that falls back to a snapshot table."""
+
+    def __init__(self, snapshot: Snapshot) -> None:
+        super().__init__()
+        self._snapshot: Optional[Snapshot] = snapshot
+        self._dropped: Set[str] = set()
+
+    def __missing__(self, term: str) -> int:
+        found = None
+        if self._snapshot is not None and term not in self._dropped:
+            found = self._snapshot.lookup("doc_frequencies", term)
+        if found is None:
+            raise KeyError(term)
+        self[term] = found[0]
+        return found[0]
+
+    def __delitem__(self, term: str) -> None:
+        self[term]  # KeyError when it's nowhere
+        self.pop(term)
+        if self._snapshot is not None:
+            self._dropped.add(term)
+
+    def __contains__(self, term) -> bool:
+        try:
+            self[term]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, term, default=None):
+        try:
+            return self[term]
+        except KeyError:
+            return default
+
+    def __iter__(self) -> Iterator[str]:
+        self.materialize()
+        return dict.__iter__(self)
+
+    def __len__(self) -> int:
+        self.materialize()
+        return dict.__len__(self)
+
+    def keys(self):
+        self.materialize()
+        return dict.keys(self)
+
+    def items(self):
+        self.materialize()
+        return dict.items(self)
+
+    def values(self):
+        self.materialize()
+        return dict.values(self)
+
+    def materialize(self) -> None:
+        if self._snapshot is None:
+            return
+        for term, df, _ in self._snapshot.items("doc_frequencies"):
+            if term not in self._dropped:
+                dict.setdefault(self, term, df)
+        self._snapshot = None
+        self._dropped.clear()
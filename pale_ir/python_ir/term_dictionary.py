@@ -0,0 +1,164 @@
+import re
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+
+def _prefix_end(prefix: str) -> str:
+    """Smallest string that sorts after every string starting with `prefix`."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class TermDictionary:
+    """
+    Sorted vocabulary supporting prefix, wildcard and fuzzy lookups.
+
+    Walking the sorted terms while reusing the work done for their shared
+    prefix is the same as walking a trie, without building one: a fuzzy lookup
+    runs a Levenshtein automaton (kept as its dynamic programming row) down
+    that implicit trie and jumps over every branch the automaton rejects.
+    """
+
+    def __init__(self, terms: Iterable[str] = ()) -> None:
+        self._terms: SortedList = SortedList(set(terms))
+        self._frozen: Optional[List[str]] = None  # Plain list copy for the fuzzy walk, dropped on change
+        self._alphabet: str = ""
+
+    def add(self, term: str) -> None:
+        if term not in self._terms:
+            self._terms.add(term)
+            self._frozen = None
+
+    def discard(self, term: str) -> None:
+        if term in self._terms:
+            self._terms.discard(term)
+            self._frozen = None
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def prefix(self, prefix: str) -> List[str]:
+        if not prefix:
+            return list(self._terms)
+        return list(self._terms.irange(prefix, _prefix_end(prefix), inclusive=(True, False)))
+
+    def wildcard(self, pattern: str) -> List[str]:
+        """Terms matching `pattern`, where `*` is any run of characters and `?` exactly one."""
+        literal = re.match(r"[^*?]*", pattern).group()
+        if literal == pattern:
+            return [pattern] if pattern in self._terms else []
+
+        regex = re.compile("".join(
+            ".*" if char == "*" else "." if char == "?" else re.escape(char) for char in pattern
+        ), re.DOTALL)
+        return [term for term in self.prefix(literal) if regex.fullmatch(term)]
+
+    def _freeze(self) -> List[str]:
+        if self._frozen is None:
+            self._frozen = list(self._terms)
+            self._alphabet = "".join(sorted(set().union(*self._frozen)))
+        return self._frozen
+
+    def _has(self, term: str) -> bool:
+        terms = self._frozen
+        i = bisect_left(terms, term)
+        return i < len(terms) and terms[i] == term
+
+    def fuzzy(self, term: str, max_edits: int = 1) -> List[Tuple[str, int]]:
+        """(candidate, distance) for every term within `max_edits` Levenshtein edits of `term`."""
+        terms = self._freeze()
+        if max_edits <= 1:
+            return self._one_edit(term, max_edits)
+
+        size = len(terms)
+        first_row = list(range(len(term) + 1))
+        rows: List[List[int]] = [first_row]  # rows[d] is the automaton state after d characters
+        previous = ""
+        matches: List[Tuple[str, int]] = []
+
+        i = 0
+        while i < size:
+            word = terms[i]
+
+            # Characters shared with the previous term were already fed to the automaton
+            shared = 0
+            limit = min(len(word), len(previous), len(rows) - 1)
+            while shared < limit and word[shared] == previous[shared]:
+                shared += 1
+            del rows[shared + 1:]
+
+            dead = False
+            for char in word[shared:]:
+                above = rows[-1]
+                row = [above[0] + 1]
+                for j, expected in enumerate(term, start=1):
+                    row.append(min(row[j - 1] + 1, above[j] + 1, above[j - 1] + (expected != char)))
+                rows.append(row)
+
+                if min(row) > max_edits:
+                    # Nothing below this prefix can match, skip to the first term after it
+                    depth = len(rows) - 1
+                    i = bisect_left(terms, _prefix_end(word[:depth]), i)
+                    del rows[depth:]
+                    dead = True
+                    break
+
+            previous = word
+            if dead:
+                continue
+
+            if rows[-1][-1] <= max_edits:
+                matches.append((word, rows[-1][-1]))
+            i += 1
+
+        return matches
+
+    def _one_edit(self, term: str, max_edits: int) -> List[Tuple[str, int]]:
+        """
+        Same answer as the automaton walk for up to one edit, but by probing every
+        single-edit neighbour of `term`: O(len(term) * alphabet) lookups instead of
+        a walk whose cost grows with how dense the vocabulary is.
+        """
+        matches = [(term, 0)] if self._has(term) else []
+        if max_edits < 1:
+            return matches
+
+        neighbours = set()
+        for i in range(len(term) + 1):
+            head, tail = term[:i], term[i:]
+            if tail:
+                neighbours.add(head + tail[1:])
+            for char in self._alphabet:
+                neighbours.add(head + char + tail)
+                if tail:
+                    neighbours.add(head + char + tail[1:])
+        neighbours.discard(term)
+
+        matches.extend((candidate, 1) for candidate in sorted(neighbours) if self._has(candidate))
+        return matches
+
+
+if __name__ == "__main__":
+    import random
+    import string
+    import time
+
+    random.seed(7)
+    vocabulary = TermDictionary(
+        "".join(random.choices(string.ascii_lowercase, k=random.randint(3, 12))) for _ in range(1_000_000)
+    )
+    print(f"{len(vocabulary)} terms")
+
+    vocabulary.fuzzy("", 0)  # Builds the lookup list once
+    for query, edits in (("love", 1), ("happen", 1), ("tonight", 1), ("tonight", 2)):
+        start = time.perf_counter()
+        found = vocabulary.fuzzy(query, edits)
+        print(f"fuzzy({query!r}, {edits}): {len(found)} terms in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    found = vocabulary.wildcard("lo*e")
+    print(f"wildcard('lo*e'): {len(found)} terms in {(time.perf_counter() - start) * 1000:.2f} ms")
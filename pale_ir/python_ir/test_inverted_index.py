@@ -0,0 +1,115 @@
+from collections import Counter
+
+import pytest
+
+from bitmap import Bitmap
+from document import Document
+from inverted_index import InvertedIndex, infix_to_postfix
+
+
+class Song:
+    """Stand-in for Document that skips reading and tokenizing a file."""
+
+    def __init__(self, doc_id, text):
+        words = text.lower().split()
+        self._id = doc_id
+        self.path = f"song{doc_id}.txt"
+        self.word_counter = Counter(words)
+        self.stem_counter = Document.compute_stem_counter(words)
+
+    def get_id(self):
+        return self._id
+
+
+SONGS = [
+    "i love you baby",
+    "lovers in the night",
+    "loved and lost",
+    "dancing all night long",
+]
+
+
+def build():
+    index = InvertedIndex()
+    for doc_id, text in enumerate(SONGS):
+        index.add_document(Song(doc_id, text))
+    return index
+
+
+def test_fuzzy_search_keeps_the_typed_term():
+    index = build()
+    exact = {doc_id for doc_id, _ in index.search("loving")}
+    fuzzy = {doc_id for doc_id, _ in index.search("loving", max_edits=1)}
+    assert exact and exact <= fuzzy
+    assert index.expand("loving", max_edits=1)[0] == "loving"
+
+
+def test_search_does_not_add_terms():
+    index = build()
+    words, stems = set(index.word_index), set(index.stem_index)
+    index.search("lover nothing")
+    index.search("lover loving nothing night", max_edits=1)
+    assert set(index.word_index) == words
+    assert set(index.stem_index) == stems
+    assert "nothing" not in index.term_dictionary
+
+
+def test_scores_after_delete_match_compacted():
+    index = build()
+    index.delete_document(0)
+    before = index.search("love night")
+    index.compact()
+    assert not index.tombstones
+    assert index.search("love night") == before
+
+
+def test_update_only_touches_the_documents_terms(tmp_path):
+    path = str(tmp_path / "index.bin")
+    build().save_to_snapshot(path)
+    index = InvertedIndex.load_from_snapshot(path)
+
+    index.update_document(Song(1, "lovers at dawn"))
+    assert index._snapshot is not None
+    # Only the old and new terms of document 1 got decoded
+    assert dict.__len__(index.word_index) < len(index.word_index)
+    assert [doc_id for doc_id, _ in index.search("night")] == [3]
+    assert [doc_id for doc_id, _ in index.search("dawn")] == [1]
+    assert "the" not in index.word_index and "the" not in index.doc_frequencies
+    index.close()
+
+
+def test_bitmap_rejects_negative_ids():
+    bitmap = Bitmap()
+    with pytest.raises(ValueError):
+        bitmap.add(-1)
+    with pytest.raises(ValueError):
+        -3 in bitmap
+    bitmap.add(9)
+    assert list(bitmap) == [9] and 1 not in bitmap
+
+
+def test_checkpoint_maps_the_new_snapshot(tmp_path):
+    snapshot, log = str(tmp_path / "index.bin"), str(tmp_path / "index.wal")
+    index = InvertedIndex.open(snapshot, log, compact_every=0)
+    for doc_id, text in enumerate(SONGS):
+        index.add_document(Song(doc_id, text))
+    expected = index.search("love night")
+
+    index.checkpoint()
+    assert index._snapshot is not None
+    assert dict.__len__(index.word_index) == 0  # Nothing decoded until a query asks
+    assert index.search("love night") == expected
+    index.close()
+
+    assert InvertedIndex.open(snapshot, log).search("love night") == expected
+
+
+def test_double_negation_parses():
+    assert infix_to_postfix("~~x") == ["x", "~", "~"]
+    assert infix_to_postfix("a & ~~b") == ["a", "b", "~", "~", "&"]
+    assert infix_to_postfix("~a & b") == ["a", "~", "b", "&"]
+
+    index = build()
+    assert index.boolean_search("~~night") == index.boolean_search("night")
+    assert index.boolean_search("love & ~~night") == index.boolean_search("love & night")
+    assert index.boolean_search("love | lover & ~~~night") == [0, 2]
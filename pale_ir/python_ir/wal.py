@@ -0,0 +1,62 @@
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterator
+
+
+class WriteAheadLog:
+    """
+    Append-only log of index changes, one record per line.
+
+    Every line is prefixed with the crc32 of its json payload, so a record that
+    was only half written when the process died is detected and dropped on
+    replay instead of corrupting the index.
+    """
+
+    def __init__(self, path: str, sync: bool = False) -> None:
+        self.path: str = path
+        self.sync: bool = sync
+        self.records: int = 0
+        self._file = open(path, "a+b")
+
+    def append(self, record: Dict[str, Any]) -> None:
+        payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._file.write(b"%08x %s\n" % (zlib.crc32(payload), payload))
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.records += 1
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Yield every intact record; a torn tail is cut off so new appends start clean."""
+        self._file.seek(0)
+        good_end = 0
+        self.records = 0
+
+        for line in self._file:
+            if not line.endswith(b"\n") or len(line) < 10:
+                break
+            checksum, payload = line[:8], line[9:-1]
+            try:
+                if int(checksum, 16) != zlib.crc32(payload):
+                    break
+                record = json.loads(payload)
+            except ValueError:
+                break
+
+            good_end += len(line)
+            self.records += 1
+            yield record
+
+        self._file.truncate(good_end)
+        self._file.seek(0, os.SEEK_END)
+
+    def truncate(self) -> None:
+        self._file.truncate(0)
+        self._file.seek(0)
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.records = 0
+
+    def close(self) -> None:
+        self._file.close()
@@ -1,33 +1,72 @@
-import json
-import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from typing import Iterable, Iterator
 
-from icecream import ic
 import pymongo
 
+import PaleIO
 
-def read(path: str):
-    with open(path) as j_file:
-        data = json.load(j_file)
-    return data
 
+def batched(records: Iterable[dict], batch_size: int) -> Iterator[list[dict]]:
+    records = iter(records)
+    while batch := list(islice(records, batch_size)):
+        yield batch
 
-def upload(db, folder: str, data: list[dict]) -> None:
-    directory = db[folder]
-    directory.insert_one(
-        ic(data)
-    )
+
+def bulk_load(collection, records: Iterable[dict], batch_size: int = 1000, workers: int = 1) -> dict:
+    """
+    Insert `records` into one collection with insert_many, batch_size documents per round trip.
+
+    `collection` can be a pymongo collection or an in-memory stand-in such as mongomock's.
+    With workers > 1 that many batches are in flight at once on threads sharing the client's
+    connection pool; at most two batches per worker are held in memory. Returns a report with
+    documents, batches, seconds and docs_per_s.
+    """
+    collection.create_index([('Name', pymongo.ASCENDING)])
+    collection.create_index([('ID', pymongo.ASCENDING)])
+
+    report = {'documents': 0, 'batches': 0, 'seconds': 0.0, 'docs_per_s': 0.0}
+    start = time.perf_counter()
+
+    def insert(batch: list[dict]) -> int:
+        collection.insert_many(batch, ordered=False)
+        return len(batch)
+
+    if workers <= 1:
+        for batch in batched(records, batch_size):
+            report['documents'] += insert(batch)
+            report['batches'] += 1
+    else:
+        with ThreadPoolExecutor(workers) as pool:
+            pending = set()
+            for batch in batched(records, batch_size):
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report['documents'] += future.result()
+                        report['batches'] += 1
+                pending.add(pool.submit(insert, batch))
+            for future in pending:
+                report['documents'] += future.result()
+                report['batches'] += 1
+
+    report['seconds'] = time.perf_counter() - start
+    report['docs_per_s'] = report['documents'] / max(report['seconds'], 1e-9)
+    return report
 
 
 if __name__ == '__main__':
     client = pymongo.MongoClient()
     db = client.SONGS
 
-    glob_folder = r'Modern Talking (Processed)'
-    songs_list = glob.glob(f'{glob_folder}/*.json')
-    db.drop_collection('songs')
-    for song in songs_list:
-        data = read(song)
-        direct = ''.join(list(filter(lambda x: str.isalpha(x) or (x == '_'), list(data['Name'].replace(' ', '_')))))
-        print(direct)
-        upload(db['Modern_Talking'], direct, data)
+    # TransPale's NDJSON output, or the older folder of one JSON file per song
+    source = 'Modern Talking (Processed).ndjson'
+    if not os.path.exists(source):
+        source = 'Modern Talking (Processed)'
 
+    db.drop_collection('Modern_Talking')
+    report = bulk_load(db.Modern_Talking, PaleIO.iter_records(source), batch_size=1000, workers=4)
+    print(f"{report['documents']} songs in {report['batches']} batches, "
+          f"{report['seconds']:.2f} s ({report['docs_per_s']:.0f} docs/s)")
@@ -0,0 +1,89 @@
+import glob
+import json
+import os
+from typing import Iterator
+
+
+class NDJSONWriter:
+    """
+    Writes records as NDJSON (one compact JSON object per line), batch_size records per write.
+
+    Everything goes to `path + '.tmp'` first and is renamed over `path` on close, so readers
+    only ever see a complete file. Leaving a `with` block through an exception drops the
+    temporary file and keeps whatever was at `path` before.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, sync: bool = True) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.sync = sync
+        self.records = 0
+        self._tmp_path = f'{path}.tmp'
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self._batch: list[str] = []
+
+    def write(self, record: dict) -> None:
+        self._batch.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self.records += 1
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        if self._batch:
+            self._file.write('\n'.join(self._batch) + '\n')
+            self._batch.clear()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self) -> None:
+        self._file.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self) -> 'NDJSONWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def iter_ndjson(path: str) -> Iterator[dict]:
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_records(source: str) -> Iterator[dict]:
+    """
+    Yield the records stored at `source`: an NDJSON file, a JSON file holding one record or a
+    list of them, or a folder of such JSON files (the old one-file-per-song output).
+    """
+    if os.path.isdir(source):
+        for path in sorted(glob.glob(os.path.join(source, '*.json'))):
+            yield from iter_records(path)
+    elif source.endswith('.ndjson'):
+        yield from iter_ndjson(source)
+    else:
+        with open(source, encoding='utf-8') as file:
+            data = json.load(file)
+        yield from data if isinstance(data, list) else [data]
+
+
+def song_name(path: str) -> str:
+    """'Modern Talking/Brother Louie.txt' -> 'Brother Louie', whatever the path separator."""
+    return os.path.splitext(os.path.basename(path))[0]
@@ -1,110 +1,437 @@
+import heapq
+import math
+import time
+import weakref
+from array import array
 from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import networkx as nx
 import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.animation import FuncAnimation
+from matplotlib.colors import to_rgba
 from icecream import ic
 
 
-class AIMethods(nx.Graph):
-    def bfs(self, start_node=None):
-        if start_node is None:
-            start_node = list(self.nodes())[0]
-
-        visited = set()
-        Q = deque([start_node])
-        order = []
-
+class CSRGraph:
+    """
+    Read-only adjacency snapshot of a graph in compressed sparse row form.
+
+    Nodes are renumbered 0..n-1 (`labels[i]` is the original node) and the
+    neighbours of node i are indices[indptr[i]:indptr[i + 1]], in the order
+    the graph lists them, with the edge weights alongside in `weights`.
+    Traversals walk these int arrays with a bytearray of visited flags, so
+    they cost a few bytes per node instead of a set of Python objects, and
+    never recurse.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, labels: Optional[List[Any]] = None,
+                 weights: Optional[np.ndarray] = None, directed: bool = False) -> None:
+        self.indptr: np.ndarray = indptr
+        self.indices: np.ndarray = indices
+        self.weights: np.ndarray = np.ones(len(indices)) if weights is None else weights
+        self.directed: bool = directed
+        self.labels: List[Any] = list(range(len(indptr) - 1)) if labels is None else labels
+        self.index: Dict[Any, int] = {label: i for i, label in enumerate(self.labels)}
+
+    @classmethod
+    def from_networkx(cls, graph: nx.Graph, weight: str = 'weight') -> 'CSRGraph':
+        labels = list(graph)
+        index = {label: i for i, label in enumerate(labels)}
+        adj = graph.adj
+
+        indptr = np.zeros(len(labels) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(adj[u]) for u in labels), dtype=np.int64, count=len(labels)), out=indptr[1:])
+        indices = np.fromiter((index[v] for u in labels for v in adj[u]), dtype=np.int64, count=int(indptr[-1]))
+        weights = np.fromiter(
+            (data.get(weight, 1) for u in labels for data in adj[u].values()), dtype=np.float64, count=int(indptr[-1])
+        )
+        return cls(indptr, indices, labels, weights, graph.is_directed())
+
+    @classmethod
+    def from_edges(cls, num_nodes: int, sources: Iterable[int], targets: Iterable[int],
+                   directed: bool = False, weights: Optional[Iterable[float]] = None) -> 'CSRGraph':
+        """Build straight from int edge arrays, for graphs too big to hold as a networkx graph."""
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        weights = np.ones(len(sources)) if weights is None else np.asarray(weights, dtype=np.float64)
+        if not directed:
+            sources, targets = np.concatenate((sources, targets)), np.concatenate((targets, sources))
+            weights = np.concatenate((weights, weights))
+
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_nodes), out=indptr[1:])
+        return cls(indptr, targets[order], weights=weights[order], directed=directed)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def reversed(self) -> 'CSRGraph':
+        """Same graph with every edge flipped; an undirected snapshot is its own reverse."""
+        if not self.directed:
+            return self
+        sources = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        flipped = CSRGraph.from_edges(len(self), self.indices, sources, directed=True, weights=self.weights)
+        flipped.labels, flipped.index = self.labels, self.index
+        return flipped
+
+    def bfs(self, start: int = 0, visited: Optional[bytearray] = None) -> Iterator[int]:
+        """Node ids in breadth first order; nodes are marked when queued so each is queued once."""
+        indptr, indices = self.indptr.data, self.indices.data  # memoryviews index to plain ints
+        visited = bytearray(len(self)) if visited is None else visited
+        if visited[start]:
+            return
+
+        visited[start] = 1
+        Q = deque([start])
         while Q:
-            current_node = Q.popleft()
-            if current_node in visited:
+            node = Q.popleft()
+            yield node
+            for p in range(indptr[node], indptr[node + 1]):
+                neighbour = indices[p]
+                if not visited[neighbour]:
+                    visited[neighbour] = 1
+                    Q.append(neighbour)
+
+    def dfs(self, start: int = 0, visited: Optional[bytearray] = None) -> Iterator[int]:
+        """Node ids in depth first preorder, the same order a recursive walk would give."""
+        indptr, indices = self.indptr.data, self.indices.data
+        visited = bytearray(len(self)) if visited is None else visited
+        if visited[start]:
+            return
+
+        visited[start] = 1
+        yield start
+        # stack of (node, next position in its neighbour list)
+        nodes = [start]
+        positions = [indptr[start]]
+        while nodes:
+            node = nodes[-1]
+            p, end = positions[-1], indptr[node + 1]
+            while p < end and visited[indices[p]]:
+                p += 1
+            if p == end:
+                nodes.pop()
+                positions.pop()
+                continue
+
+            positions[-1] = p + 1
+            neighbour = indices[p]
+            visited[neighbour] = 1
+            yield neighbour
+            nodes.append(neighbour)
+            positions.append(indptr[neighbour])
+
+    def _path(self, parents: array, node: int) -> List[int]:
+        path = []
+        while node != -1:
+            path.append(node)
+            node = parents[node]
+        return path[::-1]
+
+    def best_first(self, start: int, goal: int, priority: Callable[[float, int], float]
+                   ) -> Tuple[List[int], float, Dict[str, float]]:
+        """
+        Shared loop of ucs, greedy and astar: always expand the queued node with
+        the smallest priority(g, node), g being the cost of the best path to it.
+
+        heapq has no decrease-key, so a cheaper path just pushes the node again
+        and the outdated entry is skipped when it surfaces (lazy deletion).
+        Returns (path of ids, its cost, stats); the path is empty if goal is unreachable.
+        """
+        if len(self.weights) and self.weights.min() < 0:
+            raise ValueError('Best first search needs non-negative edge weights')
+
+        began = time.perf_counter()
+        indptr, indices, weights = self.indptr.data, self.indices.data, self.weights.data
+        best = array('d', [math.inf]) * len(self)
+        parents = array('q', [-1]) * len(self)
+        stats: Dict[str, float] = {'expanded': 0, 'pushed': 1, 'stale': 0, 'frontier_peak': 1, 'seconds': 0.0}
+
+        best[start] = 0.0
+        heap = [(priority(0.0, start), 0.0, start)]
+        while heap:
+            _, g, node = heapq.heappop(heap)
+            if g > best[node]:
+                stats['stale'] += 1
+                continue
+            if node == goal:
+                break
+
+            stats['expanded'] += 1
+            for p in range(indptr[node], indptr[node + 1]):
+                neighbour, cost = indices[p], g + weights[p]
+                if cost < best[neighbour]:
+                    best[neighbour] = cost
+                    parents[neighbour] = node
+                    heapq.heappush(heap, (priority(cost, neighbour), cost, neighbour))
+                    stats['pushed'] += 1
+            stats['frontier_peak'] = max(stats['frontier_peak'], len(heap))
+
+        stats['seconds'] = time.perf_counter() - began
+        if best[goal] == math.inf:
+            return [], math.inf, stats
+        return self._path(parents, goal), best[goal], stats
+
+    def ucs(self, start: int, goal: int) -> Tuple[List[int], float, Dict[str, float]]:
+        return self.best_first(start, goal, lambda g, node: g)
+
+    def greedy(self, start: int, goal: int, heuristic: Callable[[int], float]
+               ) -> Tuple[List[int], float, Dict[str, float]]:
+        """Expand by heuristic alone: fast, but the path found need not be the cheapest."""
+        return self.best_first(start, goal, lambda g, node: heuristic(node))
+
+    def astar(self, start: int, goal: int, heuristic: Callable[[int], float]
+              ) -> Tuple[List[int], float, Dict[str, float]]:
+        """Cheapest path as long as `heuristic` never overestimates the remaining cost."""
+        return self.best_first(start, goal, lambda g, node: g + heuristic(node))
+
+    def bidirectional(self, start: int, goal: int) -> Tuple[List[int], float, Dict[str, float]]:
+        """
+        Uniform cost search from both ends at once, growing whichever frontier
+        is smaller, until no path through the frontiers can beat the best
+        meeting point found so far.
+        """
+        if len(self.weights) and self.weights.min() < 0:
+            raise ValueError('Bidirectional search needs non-negative edge weights')
+
+        began = time.perf_counter()
+        stats: Dict[str, float] = {'expanded': 0, 'pushed': 2, 'stale': 0, 'frontier_peak': 2, 'seconds': 0.0}
+        sides = []
+        for graph, source in ((self, start), (self.reversed(), goal)):
+            best = array('d', [math.inf]) * len(self)
+            best[source] = 0.0
+            sides.append((graph.indptr.data, graph.indices.data, graph.weights.data,
+                          best, array('q', [-1]) * len(self), [(0.0, source)]))
+
+        shortest, meeting = (0.0, start) if start == goal else (math.inf, -1)
+        forward, backward = sides
+        while forward[5] and backward[5] and forward[5][0][0] + backward[5][0][0] < shortest:
+            side, other = (forward, backward) if len(forward[5]) <= len(backward[5]) else (backward, forward)
+            indptr, indices, weights, best, parents, heap = side
+
+            g, node = heapq.heappop(heap)
+            if g > best[node]:
+                stats['stale'] += 1
                 continue
 
-            order.append(current_node)
-            visited.add(current_node)
+            stats['expanded'] += 1
+            for p in range(indptr[node], indptr[node + 1]):
+                neighbour, cost = indices[p], g + weights[p]
+                if cost < best[neighbour]:
+                    best[neighbour] = cost
+                    parents[neighbour] = node
+                    heapq.heappush(heap, (cost, neighbour))
+                    stats['pushed'] += 1
+                if cost + other[3][neighbour] < shortest:
+                    shortest, meeting = cost + other[3][neighbour], neighbour
+            stats['frontier_peak'] = max(stats['frontier_peak'], len(forward[5]) + len(backward[5]))
+
+        stats['seconds'] = time.perf_counter() - began
+        if meeting == -1:
+            return [], math.inf, stats
+        head = self._path(forward[4], meeting)
+        tail = self._path(backward[4], meeting)[::-1]
+        return head + tail[1:], shortest, stats
+
+
+# Layouts by graph, kept out of graph.graph so nx.write_* never saves them
+_LAYOUTS: 'weakref.WeakKeyDictionary[nx.Graph, Tuple[Any, Dict[Any, np.ndarray]]]' = weakref.WeakKeyDictionary()
+
+
+def spring_layout(graph: nx.Graph, seed: int = 7) -> Dict[Any, np.ndarray]:
+    """nx.spring_layout, computed once per graph and reused until its nodes or edges change."""
+    edges = graph.edges if graph.is_directed() else map(frozenset, graph.edges)
+    key = (seed, frozenset(graph), frozenset(edges), graph.number_of_edges())
+    cached = _LAYOUTS.get(graph)
+    if cached is None or cached[0] != key:
+        cached = _LAYOUTS[graph] = key, nx.spring_layout(graph, seed=seed)
+    return cached[1]
+
+
+class TraversalRenderer:
+    """
+    Animates a traversal order without redrawing the graph.
+
+    Nodes, edges and labels are drawn once; each step only rewrites the
+    colour rows of the nodes and edges it touches in the RGBA arrays backing
+    the node PathCollection and edge LineCollection, so a step costs the
+    handful of changed rows plus one repaint. Steps can be batched per frame,
+    and `export` renders the frames offline with blitting.
+    """
+
+    NODE = {'current': to_rgba('tab:green'), 'visited': to_rgba('tab:purple'), 'fresh': to_rgba('tab:red')}
+    RIM = {'current': to_rgba('green'), 'visited': to_rgba('pink'), 'fresh': to_rgba('red')}
+    EDGE = {'visited': to_rgba('tab:purple', 0.5), 'fresh': to_rgba('tab:red', 0.5)}
+
+    def __init__(self, graph: nx.Graph, pos: Optional[Dict[Any, Any]] = None, size_hint: Optional[int] = None,
+                 with_labels: bool = True) -> None:
+        self.graph = graph
+        self.pos = spring_layout(graph) if pos is None else pos
+        size_hint = len(graph) if size_hint is None else size_hint
+        font_size = max(22 - size_hint, 8)
+        node_size = max(800 - size_hint * 25, 150)
 
-            for node in self[current_node]:
-                if node in visited:
-                    continue
-                Q.append(node)
+        plt.style.use('dark_background')
+        self.fig, self.ax = plt.subplots(nrows=1, ncols=1)
+        self.ax.set_axis_off()
+
+        nodes = list(graph)
+        self.index: Dict[Any, int] = {node: i for i, node in enumerate(nodes)}
+        self.faces = np.tile(self.NODE['fresh'], (len(nodes), 1))
+        self.rims = np.tile(self.RIM['fresh'], (len(nodes), 1))
+
+        # an edge turns purple once the node it points to is visited
+        edges = list(graph.edges)
+        self.lines = np.tile(self.EDGE['fresh'], (len(edges), 1))
+        self.incoming: Dict[Any, List[int]] = {node: [] for node in nodes}
+        for i, (_, head) in enumerate(edges):
+            self.incoming[head].append(i)
+
+        self.edge_artist = nx.draw_networkx_edges(
+            graph, self.pos, edgelist=edges, width=node_size // 40, edge_color=self.lines, arrows=False, ax=self.ax
+        )
+        self.node_artist = nx.draw_networkx_nodes(
+            graph, self.pos, nodelist=nodes, node_size=node_size, node_color=self.faces, edgecolors=self.rims,
+            ax=self.ax
+        )
+        self.labels = list(nx.draw_networkx_labels(
+            graph, self.pos, font_size=font_size, font_color='whitesmoke', ax=self.ax
+        ).values()) if with_labels else []
+        self.fig.tight_layout()
+
+        self.current: Optional[int] = None
+
+    def _paint(self, i: int, state: str) -> None:
+        self.faces[i] = self.NODE[state]
+        self.rims[i] = self.RIM[state]
+
+    def step(self, nodes: Iterable[Any]) -> List[Any]:
+        """Visit `nodes` in order and push the new colours to the artists, returned for blitting."""
+        for node in nodes:
+            if self.current is not None:
+                self._paint(self.current, 'visited')
+            self.current = self.index[node]
+            self._paint(self.current, 'current')
+            self.lines[self.incoming[node]] = self.EDGE['visited']
+
+        self.node_artist.set_facecolor(self.faces)
+        self.node_artist.set_edgecolor(self.rims)
+        self.edge_artist.set_color(self.lines)
+        return [self.edge_artist, self.node_artist, *self.labels]
+
+    def finish(self) -> List[Any]:
+        self.faces[:] = self.NODE['visited']
+        self.rims[:] = to_rgba('whitesmoke')
+        self.node_artist.set_facecolor(self.faces)
+        self.node_artist.set_edgecolor(self.rims)
+        return [self.edge_artist, self.node_artist, *self.labels]
+
+    def play(self, order: List[Any], ptime: float = 0.2, batch: int = 1) -> None:
+        """Show the traversal live, `batch` nodes per frame."""
+        for start in range(0, len(order), batch):
+            self.step(order[start:start + batch])
+            self.fig.canvas.draw_idle()
+            plt.pause(ptime)
+        self.finish()
+        plt.show()
 
-        return order
+    def export(self, order: List[Any], path: str, fps: int = 10, batch: int = 1) -> None:
+        """Render the traversal to a gif (pillow) or video (ffmpeg) file, without opening a window."""
+        frames = list(range(0, len(order), batch))
 
-    def dfs(self, start_node=None, visited=None):
-        if start_node is None:
-            start_node = list(self.nodes())[0]
+        def update(frame: int) -> List[Any]:
+            if frame == len(order):
+                return self.finish()
+            return self.step(order[frame:frame + batch])
 
-        if visited is None:
-            visited = set()
+        animation = FuncAnimation(
+            self.fig, update, frames=frames + [len(order)], init_func=lambda: self.step(()), blit=True, repeat=False
+        )
+        animation.save(path, writer='pillow' if path.endswith('.gif') else 'ffmpeg', fps=fps)
+        plt.close(self.fig)
 
-        order = []
 
-        if start_node in visited:
-            return order
+class AIMethods(nx.Graph):
+    @staticmethod
+    def _traverse(graph: nx.Graph, method: str, start_node: Any = None, visited: Optional[set] = None) -> Iterator[Any]:
+        csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+        if not len(csr):
+            return
+        start = 0 if start_node is None else csr.index[start_node]
+
+        flags = bytearray(len(csr))
+        for node in visited or ():
+            flags[csr.index[node]] = 1
+
+        for i in getattr(csr, method)(start, flags):
+            node = csr.labels[i]
+            if visited is not None:
+                visited.add(node)
+            yield node
+
+    def iter_bfs(self, start_node=None, visited=None):
+        """Generator version of bfs, also accepting a prebuilt CSRGraph."""
+        return AIMethods._traverse(self, 'bfs', start_node, visited)
+
+    def iter_dfs(self, start_node=None, visited=None):
+        """Generator version of dfs, also accepting a prebuilt CSRGraph."""
+        return AIMethods._traverse(self, 'dfs', start_node, visited)
 
-        order.append(start_node)
-        visited.add(start_node)
+    def bfs(self, start_node=None):
+        return list(AIMethods.iter_bfs(self, start_node))
 
-        for node in self[start_node]:
-            if node in visited:
-                continue
+    def dfs(self, start_node=None, visited=None):
+        return list(AIMethods.iter_dfs(self, start_node, visited))
 
-            order.extend(AIMethods.dfs(self, start_node=node, visited=visited))
+    @staticmethod
+    def _search(graph: nx.Graph, method: str, start_node: Any, goal_node: Any,
+                heuristic: Optional[Callable[[Any, Any], float]] = None, weight: str = 'weight'
+                ) -> Tuple[List[Any], float, Dict[str, float]]:
+        csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph, weight)
+        start, goal = csr.index[start_node], csr.index[goal_node]
 
-        return order
+        args = ()
+        if heuristic is not None:
+            labels = csr.labels
+            args = (lambda node: heuristic(labels[node], goal_node),)
 
-    def display(self, order, pos=None, ptime=0.2):
-        if pos is None:
-            pos = nx.spring_layout(self, seed=7)
+        path, cost, stats = getattr(csr, method)(start, goal, *args)
+        return [csr.labels[node] for node in path], cost, stats
 
-        font_size = max(22 - len(order), 8)
-        node_size = max(800 - len(order) * 25, 150)
+    def ucs(self, start_node, goal_node, weight='weight'):
+        """(path, cost, stats) of the cheapest path; stats has expanded, pushed, stale, frontier_peak and seconds."""
+        return AIMethods._search(self, 'ucs', start_node, goal_node, weight=weight)
 
-        plt.style.use('dark_background')
-        plt.subplots(nrows=1, ncols=1)
-        visited = set()
-        nx.draw_shell(self, with_labels=True)
-
-        for i, node in enumerate(order, start=1):
-            visited.add(node)
-            plt.clf()
-            nx.draw_networkx_labels(self, pos, font_size=font_size, font_color='whitesmoke')
-
-            nx.draw_networkx_nodes(
-                self,
-                pos,
-                node_size=node_size,
-                alpha=0.9,
-                edgecolors=[
-                    'green' if n == node else
-                    'pink' if n in visited else 'red'
-                    for n in self.nodes
-                ],
-
-                node_color=[
-                    'tab:green' if n == node else
-                    'tab:purple' if n in visited else 'tab:red'
-                    for n in self.nodes
-                ]
-            )
-            nx.draw_networkx_edges(
-                self,
-                pos,
-                width=node_size // 40,
-                alpha=0.5,
-                edge_color=[
-                    'tab:purple' if e[1] in visited else 'tab:red'
-                    for e in self.edges
-                ],
-            )
-
-            plt.tight_layout()
-            plt.draw()
-            plt.pause(ptime)
+    def greedy(self, start_node, goal_node, heuristic, weight='weight'):
+        return AIMethods._search(self, 'greedy', start_node, goal_node, heuristic, weight)
 
-        nx.draw_networkx_nodes(
-            self, pos, node_size=node_size, alpha=0.99, edgecolors='whitesmoke', node_color='tab:purple'
-        )
-        plt.show()
+    def astar(self, start_node, goal_node, heuristic=None, weight='weight'):
+        """heuristic(node, goal_node) estimates the remaining cost; without one this is ucs."""
+        return AIMethods._search(self, 'astar', start_node, goal_node, heuristic or (lambda node, goal: 0), weight)
+
+    def bidirectional(self, start_node, goal_node, weight='weight'):
+        return AIMethods._search(self, 'bidirectional', start_node, goal_node, weight=weight)
+
+    @staticmethod
+    def euclidean(pos: Dict[Any, Any]) -> Callable[[Any, Any], float]:
+        """Straight line distance between layout positions, as an astar heuristic."""
+        return lambda node, goal: math.dist(pos[node], pos[goal])
+
+    @staticmethod
+    def manhattan(node: Tuple[int, ...], goal: Tuple[int, ...]) -> float:
+        """Heuristic for grid graphs whose nodes are coordinate tuples."""
+        return sum(abs(a - b) for a, b in zip(node, goal))
+
+    def display(self, order, pos=None, ptime=0.2, batch=1, save=None):
+        """Animate `order` on the graph; with `save` the frames go to that gif/video file instead of a window."""
+        renderer = TraversalRenderer(self, pos, size_hint=len(order))
+        if save is None:
+            renderer.play(order, ptime, batch)
+        else:
+            renderer.export(order, save, fps=max(round(1 / ptime), 1), batch=batch)
 
 
 def main():
@@ -128,6 +455,16 @@ def main():
 
     ptime = 0.5
 
+    grid = nx.grid_2d_graph(100, 100)
+    for name, run in (
+            ('ucs', lambda: AIMethods.ucs(grid, (0, 0), (99, 50))),
+            ('greedy', lambda: AIMethods.greedy(grid, (0, 0), (99, 50), AIMethods.manhattan)),
+            ('astar', lambda: AIMethods.astar(grid, (0, 0), (99, 50), AIMethods.manhattan)),
+            ('bidirectional', lambda: AIMethods.bidirectional(grid, (0, 0), (99, 50))),
+    ):
+        path, cost, stats = run()
+        ic(name, cost, stats)
+
     AIMethods.display(G, AIMethods.dfs(G), ptime=ptime)
     AIMethods.display(G, AIMethods.bfs(G, start_node="K"))
     AIMethods.display(L, AIMethods.dfs(L))
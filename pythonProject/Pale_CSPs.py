@@ -1,5 +1,10 @@
-from collections import deque
-from typing import List, Tuple, Callable, Any
+import random
+import sys
+import time
+from collections import deque, defaultdict
+from typing import List, Tuple, Callable, Any, Dict, Iterator, Optional, Set
+
+import numpy as np
 
 
 def eq(x: Any, y: Any) -> bool: return x == y
@@ -46,6 +51,11 @@ class Node:
             if con is method[0]:
                 return method[1]
 
+    @staticmethod
+    def reverse(con: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+        """`con` seen from its right node: the mirrored operator if it has one, else `con` with swapped arguments."""
+        return Node.get_other_constraint(con) or (lambda y, x, con=con: con(x, y))
+
     def forward_check(self, other: 'Node', con: Callable[[Any, Any], bool]) -> List[Any]:
         ind = 0
         for value in self.result_domain:
@@ -75,7 +85,7 @@ class Node:
         Q: deque[Tuple['Node', 'Node', Callable[[Any, Any], bool]]] = deque()
         for left, right, con in all_constraints:
             Q.append((left, right, con))
-            Q.append((right, left, Node.get_other_constraint(con)))
+            Q.append((right, left, Node.reverse(con)))
 
         done: List[Tuple[Tuple['Node', 'Node', Callable[[Any, Any], bool]], Any]] = []
         while Q:
@@ -86,6 +96,104 @@ class Node:
 
             done.append(Q.popleft())
 
+    @staticmethod
+    def ac3(all_constraints: List[List[Any]], vectorize: bool = True) -> bool:
+        """
+        AC-3 with residual supports.
+
+        Arcs are indexed by the node they point at, so when a domain shrinks only
+        the arcs that read it are requeued. Each (arc, value) remembers the last
+        support it found and only rescans when that support is gone. This beats
+        AC-2001's resumable pointers here: those walk the full original domain
+        and pay extra bookkeeping per value, which costs more than they save on
+        small domains. Numeric domains are checked with one broadcast numpy comparison per arc
+        when `vectorize` is on. Returns False if some domain ends up empty.
+        """
+        arcs: List[Tuple['Node', 'Node', Callable[[Any, Any], bool]]] = []
+        for left, right, con in all_constraints:
+            arcs.append((left, right, con))
+            arcs.append((right, left, Node.reverse(con)))
+
+        incoming: Dict['Node', List[int]] = defaultdict(list)
+        for i, (_, right, _) in enumerate(arcs):
+            incoming[right].append(i)
+
+        Q: deque[int] = deque(range(len(arcs)))
+        queued: List[bool] = [True] * len(arcs)
+        last: Dict[int, Dict[Any, Any]] = defaultdict(dict)
+        alive: Dict['Node', Set[Any]] = {node: set(node.result_domain) for node in incoming}
+        numeric: Dict['Node', bool] = {
+            node: vectorize and all(type(v) in (int, float) for v in node.domain)
+            for node in incoming
+        }
+
+        while Q:
+            i = Q.popleft()
+            queued[i] = False
+            left, right, con = arcs[i]
+
+            left.revise(right, con, last[i], numeric[left] and numeric[right], alive[right])
+            if not left.changed:
+                continue
+            if not left.result_domain:
+                return False
+            alive[left] = set(left.result_domain)
+
+            for j in incoming[left]:
+                # i ^ 1 is the same constraint seen from the other side, it can't lose support from this
+                if j != i ^ 1 and not queued[j]:
+                    queued[j] = True
+                    Q.append(j)
+
+        return True
+
+    def revise(
+            self, other: 'Node', con: Callable[[Any, Any], bool], last: Dict[Any, Any], vectorize: bool = False,
+            alive: Optional[Set[Any]] = None
+    ) -> List[Any]:
+        """
+        forward_check for ac3: same result, but each value first retries its
+        last support (`last` maps value -> that support in `other`) and only
+        rescans `other` once it was removed. `alive` is `other.result_domain`
+        as a set, when the caller keeps one up to date. `vectorize` is only for
+        numeric domains.
+        """
+        keep = self._vectorized_support(other, con) if vectorize else None
+
+        if keep is None:
+            if alive is None:
+                alive = set(other.result_domain)
+            keep = []
+            for value in self.result_domain:
+                if value in last and last[value] in alive:
+                    keep.append(True)
+                    continue
+
+                for other_value in other.result_domain:
+                    if con(value, other_value):
+                        last[value] = other_value
+                        keep.append(True)
+                        break
+                else:
+                    keep.append(False)
+
+        self.changed = not all(keep)
+        if self.changed:
+            self.result_domain = [value for value, kept in zip(self.result_domain, keep) if kept]
+        return self.result_domain
+
+    def _vectorized_support(self, other: 'Node', con: Callable[[Any, Any], bool]) -> Optional[List[bool]]:
+        """Which values have a support, via one numpy comparison; None when `con` doesn't broadcast."""
+        x = np.asarray(self.result_domain)
+        y = np.asarray(other.result_domain)
+        try:
+            supported = np.asarray(con(x[:, None], y[None, :]), dtype=bool)
+        except (TypeError, ValueError):
+            return None
+        if supported.shape != (len(x), len(y)):
+            return None
+        return supported.any(axis=1).tolist()
+
     @staticmethod
     def show():
         print("---{Pale_exe CSPs}---".center(97))
@@ -100,6 +208,335 @@ class Node:
         Node.graphs.append(args)
 
 
+class Solver:
+    """
+    Backtracking search over Nodes and the usual [left, right, con] constraints.
+
+    Variables are picked by MRV (fewest values left), ties broken by degree,
+    and their values tried least-constraining first. After every assignment
+    the domains are pruned by forward checking or, with `mac`, by maintaining
+    arc consistency. Domains are sparse sets: a removal swaps the value past
+    the live end and logs the old size on a trail, so backtracking only
+    restores sizes instead of copying lists.
+    """
+
+    def __init__(self, all_constraints: List[List[Any]], nodes: Tuple['Node', ...] = (), mac: bool = True,
+                 lcv: bool = True) -> None:
+        self.mac: bool = mac
+        self.lcv: bool = lcv
+
+        self.nodes: List[Node] = list(dict.fromkeys(
+            [*nodes, *(node for left, right, _ in all_constraints for node in (left, right))]
+        ))
+        # node -> [(other, con)] where con(value of node, value of other) must hold
+        self.arcs: Dict[Node, List[Tuple[Node, Callable[[Any, Any], bool]]]] = {node: [] for node in self.nodes}
+        for left, right, con in all_constraints:
+            other_con = Node.reverse(con)
+            self.arcs[left].append((right, con))
+            self.arcs[right].append((left, other_con))
+
+        self._values: Dict[Node, List[Any]] = {}
+        self._position: Dict[Node, Dict[Any, int]] = {}
+        self._size: Dict[Node, int] = {}
+        self._trail: List[Tuple[Node, int]] = []
+        self.stats: Dict[str, float] = {}
+
+    def _reset(self) -> None:
+        for node in self.nodes:
+            self._values[node] = list(node.result_domain)
+            self._position[node] = {value: i for i, value in enumerate(self._values[node])}
+            self._size[node] = len(self._values[node])
+        self._trail.clear()
+        self.stats = {'nodes': 0, 'backtracks': 0, 'revisions': 0, 'solutions': 0, 'seconds': 0.0}
+
+    def domain(self, node: 'Node') -> List[Any]:
+        return self._values[node][:self._size[node]]
+
+    def _remove(self, node: 'Node', value: Any) -> None:
+        values, position = self._values[node], self._position[node]
+        size = self._size[node]
+        i, last = position[value], size - 1
+        values[i], values[last] = values[last], values[i]
+        position[values[i]], position[value] = i, last
+
+        self._trail.append((node, size))
+        self._size[node] = last
+
+    def _undo(self, mark: int) -> None:
+        while len(self._trail) > mark:
+            node, size = self._trail.pop()
+            self._size[node] = size
+
+    def _revise(self, node: 'Node', other: 'Node', con: Callable[[Any, Any], bool]) -> bool:
+        """Drop the values of node without a support in other; True if any went."""
+        self.stats['revisions'] += 1
+        others = self.domain(other)
+        removed = [value for value in self.domain(node) if not any(con(value, o) for o in others)]
+        for value in removed:
+            self._remove(node, value)
+        return bool(removed)
+
+    def _propagate(self, var: 'Node', assigned: Dict['Node', Any]) -> bool:
+        """Prune after assigning var; False on a wiped out domain."""
+        if not self.mac:
+            for other, con in self.arcs[var]:
+                if other not in assigned:
+                    for value in self.domain(other):
+                        if not con(assigned[var], value):
+                            self._remove(other, value)
+                    if not self._size[other]:
+                        return False
+            return True
+
+        Q: deque[Tuple[Node, Node]] = deque((other, var) for other, _ in self.arcs[var])
+        while Q:
+            node, other = Q.popleft()
+            for neighbour, con in self.arcs[node]:
+                if neighbour is not other or not self._revise(node, other, con):
+                    continue
+                if not self._size[node]:
+                    return False
+                Q.extend((nxt, node) for nxt, _ in self.arcs[node] if nxt is not other)
+        return True
+
+    def _select(self, assigned: Dict['Node', Any]) -> 'Node':
+        return min(
+            (node for node in self.nodes if node not in assigned),
+            key=lambda node: (self._size[node], -sum(other not in assigned for other, _ in self.arcs[node])),
+        )
+
+    def _order(self, var: 'Node', assigned: Dict['Node', Any]) -> List[Any]:
+        values = self.domain(var)
+        if not self.lcv:
+            return values
+
+        def ruled_out(value: Any) -> int:
+            return sum(
+                not con(value, other_value)
+                for other, con in self.arcs[var] if other not in assigned
+                for other_value in self.domain(other)
+            )
+
+        return sorted(values, key=ruled_out)
+
+    def _search(self, assigned: Dict['Node', Any]) -> Iterator[Dict[str, Any]]:
+        if len(assigned) == len(self.nodes):
+            self.stats['solutions'] += 1
+            yield {node.name: assigned[node] for node in self.nodes}
+            return
+
+        var = self._select(assigned)
+        for value in self._order(var, assigned):
+            self.stats['nodes'] += 1
+            mark = len(self._trail)
+
+            for other in self.domain(var):
+                if other != value:
+                    self._remove(var, other)
+            assigned[var] = value
+
+            if self._propagate(var, assigned):
+                yield from self._search(assigned)
+            else:
+                self.stats['backtracks'] += 1
+
+            del assigned[var]
+            self._undo(mark)
+
+    def solutions(self) -> Iterator[Dict[str, Any]]:
+        """Every solution as {node name: value}; `stats` is kept up to date while iterating."""
+        self._reset()
+        start = time.perf_counter()
+        if all(self._size.values()):
+            for solution in self._search({}):
+                self.stats['seconds'] = time.perf_counter() - start
+                yield solution
+        self.stats['seconds'] = time.perf_counter() - start
+
+    def solve(self) -> Optional[Dict[str, Any]]:
+        """First solution found, or None."""
+        solutions = self.solutions()
+        solution = next(solutions, None)
+        solutions.close()
+        return solution
+
+    def count(self) -> int:
+        return sum(1 for _ in self.solutions())
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+
+def _bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Problem:
+    """
+    A CSP owning its own variables, domains and constraints.
+
+    Unlike Node, nothing is kept on the class, so problems don't leak into
+    each other and can be pickled into a process pool (see solve_many) as
+    long as their constraints are module level functions like eq or lt.
+    Each domain is an int used as a bitset over the variable's values, and
+    every arc keeps, per value, the bitset of values supporting it on the
+    other side, so a revision is one AND per value instead of calling `con`.
+    """
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self.values: List[List[Any]] = []
+        self.domains: List[int] = []
+        self.constraints: List[Tuple[int, int, Callable[[Any, Any], bool]]] = []
+        self.stats: Dict[str, float] = {}
+        self._index: Dict[str, int] = {}
+        self._arcs: Optional[List[List[Tuple[int, List[int], List[int]]]]] = None
+
+    def add_variable(self, name: str, domain: List[Any]) -> int:
+        if name in self._index:
+            raise ValueError(f'Variable {name!r} already exists')
+        self._index[name] = len(self.names)
+        self.names.append(name)
+        self.values.append(list(domain))
+        self.domains.append((1 << len(domain)) - 1)
+        self._arcs = None
+        return self._index[name]
+
+    def add_constraint(self, left: str, right: str, con: Callable[[Any, Any], bool]) -> None:
+        self.constraints.append((self._index[left], self._index[right], con))
+        self._arcs = None
+
+    @classmethod
+    def from_nodes(cls, all_constraints: List[List[Any]], nodes: Tuple['Node', ...] = ()) -> 'Problem':
+        """Copy Nodes (starting from their result_domain) and their constraints into a Problem."""
+        problem = cls()
+        for node in dict.fromkeys([*nodes, *(node for left, right, _ in all_constraints for node in (left, right))]):
+            problem.add_variable(node.name, node.result_domain)
+        for left, right, con in all_constraints:
+            problem.add_constraint(left.name, right.name, con)
+        return problem
+
+    def _compile(self) -> List[List[Tuple[int, List[int], List[int]]]]:
+        """
+        var -> [(other, supports, backs)]: supports[i] is the bitset of other's
+        values allowing var's value i, backs[j] that of var's values allowing
+        other's value j.
+        """
+        if self._arcs is None:
+            self._arcs = [[] for _ in self.names]
+            for left, right, con in self.constraints:
+                xs, ys = self.values[left], self.values[right]
+                supports = [sum(1 << j for j, y in enumerate(ys) if con(x, y)) for x in xs]
+                backs = [sum(1 << i for i, x in enumerate(xs) if con(x, y)) for y in ys]
+                self._arcs[left].append((right, supports, backs))
+                self._arcs[right].append((left, backs, supports))
+        return self._arcs
+
+    def _propagate(self, domains: List[int], trail: List[Tuple[int, int]], changed: List[int]) -> bool:
+        """AC-3 on bitsets from the variables in `changed`; False on a wiped out domain."""
+        arcs = self._arcs
+        Q: deque[int] = deque(changed)
+        queued = set(changed)
+        while Q:
+            var = Q.popleft()
+            queued.discard(var)
+            mask = domains[var]
+            for other, _, backs in arcs[var]:
+                old = domains[other]
+                new = old
+                for j in _bits(old):
+                    if not backs[j] & mask:
+                        new &= ~(1 << j)
+                if new == old:
+                    continue
+
+                self.stats['revisions'] += 1
+                if not new:
+                    return False
+                trail.append((other, old))
+                domains[other] = new
+                if other not in queued:
+                    queued.add(other)
+                    Q.append(other)
+        return True
+
+    def _search(self, domains: List[int], trail: List[Tuple[int, int]]) -> Iterator[Dict[str, Any]]:
+        arcs = self._arcs
+        open_vars = [var for var, mask in enumerate(domains) if mask & (mask - 1)]
+        if not open_vars:
+            self.stats['solutions'] += 1
+            yield {name: values[mask.bit_length() - 1] for name, values, mask in zip(self.names, self.values, domains)}
+            return
+
+        # MRV, then the variable touching the most open ones
+        var = min(open_vars, key=lambda v: (
+            _popcount(domains[v]), -sum(domains[o] & (domains[o] - 1) != 0 for o, _, _ in arcs[v])
+        ))
+
+        # LCV: fewest neighbour values ruled out first
+        order = sorted(_bits(domains[var]), key=lambda i: sum(
+            _popcount(domains[o] & ~supports[i]) for o, supports, _ in arcs[var]
+        ))
+
+        for i in order:
+            self.stats['nodes'] += 1
+            mark = len(trail)
+            trail.append((var, domains[var]))
+            domains[var] = 1 << i
+
+            if self._propagate(domains, trail, [var]):
+                yield from self._search(domains, trail)
+            else:
+                self.stats['backtracks'] += 1
+
+            while len(trail) > mark:
+                other, old = trail.pop()
+                domains[other] = old
+
+    def solutions(self) -> Iterator[Dict[str, Any]]:
+        """Every solution as {variable name: value}, found with MRV, LCV and MAC."""
+        self._compile()
+        self.stats = {'nodes': 0, 'backtracks': 0, 'revisions': 0, 'solutions': 0, 'seconds': 0.0}
+        start = time.perf_counter()
+
+        domains = list(self.domains)
+        trail: List[Tuple[int, int]] = []
+        if all(domains) and self._propagate(domains, trail, list(range(len(domains)))):
+            for solution in self._search(domains, trail):
+                self.stats['seconds'] = time.perf_counter() - start
+                yield solution
+        self.stats['seconds'] = time.perf_counter() - start
+
+    def solve(self) -> Optional[Dict[str, Any]]:
+        solutions = self.solutions()
+        solution = next(solutions, None)
+        solutions.close()
+        return solution
+
+    def count(self) -> int:
+        return sum(1 for _ in self.solutions())
+
+
+def _run_problem(task: Tuple[Problem, bool]) -> Tuple[Any, Dict[str, float]]:
+    problem, count = task
+    result = problem.count() if count else problem.solve()
+    return result, problem.stats
+
+
+def solve_many(
+        problems: List[Problem], count: bool = False, processes: Optional[int] = None
+) -> List[Tuple[Any, Dict[str, float]]]:
+    """(first solution or solution count, stats) for each problem, solved in a process pool."""
+    import multiprocessing
+
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(_run_problem, [(problem, count) for problem in problems])
+
+
 def main():
     A = Node('A', [1, 2, 3, 4])
     B = Node('B', [1, 2, 4])
@@ -145,6 +582,67 @@ def main():
     Node.arc_consistency(L2)
     Node.show()
 
+    for constraints in (L2, L3):
+        solver = Solver(constraints)
+        print(solver.solve(), f'{solver.count()} solutions', solver.stats)
+
+
+def random_csp(num_nodes: int, domain_size: int, density: float, seed: int = 7) -> List[List[Any]]:
+    """
+    Random binary CSP over integer domains, `density` being the chance two nodes are constrained.
+
+    Constraints are only drawn among those a hidden assignment satisfies, so the problem always has a solution.
+    """
+    rng = random.Random(seed)
+    nodes = [
+        Node(f'X{i}', sorted(rng.sample(range(domain_size * 2), domain_size)))
+        for i in range(num_nodes)
+    ]
+    hidden = [rng.choice(node.domain) for node in nodes]
+
+    constraints = []
+    for i in range(num_nodes):
+        for j in range(i + 1, num_nodes):
+            if rng.random() < density:
+                options = [con for con in (eq, nq, lt, gt, le, ge) if con(hidden[i], hidden[j]) and con is not eq]
+                constraints.append([nodes[i], nodes[j], rng.choice(options)])
+    return constraints
+
+
+def benchmark(num_nodes: int = 60, domain_size: int = 60, density: float = 0.2, seed: int = 7) -> None:
+    constraints = random_csp(num_nodes, domain_size, density, seed)
+    nodes = list({id(n): n for c in constraints for n in c[:2]}.values())
+    print(f'{len(nodes)} nodes, {domain_size} values each, {len(constraints)} constraints')
+
+    results = {}
+    for name, run in (
+            ('arc_consistency', lambda: Node.arc_consistency(constraints)),
+            ('ac3 (residues)', lambda: Node.ac3(constraints, vectorize=False)),
+            ('ac3 (numpy)', lambda: Node.ac3(constraints)),
+    ):
+        for node in nodes:
+            node.result_domain = node.domain.copy()
+
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+
+        results[name] = [node.result_domain for node in nodes]
+        print(f'{name:<20}{elapsed * 1000:>10.1f} ms {sum(map(len, results[name])):>8} values left')
+
+    print('ac3 variants agree:', results['ac3 (residues)'] == results['ac3 (numpy)'])
+
+    problems = [Problem.from_nodes(random_csp(40, 20, 0.3, seed + i)) for i in range(8)]
+    Node.all_instance.clear()
+    start = time.perf_counter()
+    solved = solve_many(problems)
+    elapsed = time.perf_counter() - start
+    print(f'solve_many: {len(problems)} problems in {elapsed * 1000:.1f} ms, '
+          f'{sum(stats["nodes"] for _, stats in solved)} nodes, {sum(s is not None for s, _ in solved)} solved')
+
 
 if __name__ == '__main__':
-    main()
+    if sys.argv[1:] == ['bench']:
+        benchmark()
+    else:
+        main()
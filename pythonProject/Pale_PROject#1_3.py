@@ -1,19 +1,95 @@
-import re
 import json
+import time
 import operator
+from datetime import date
+
 import numpy as np
 
 
+class Catalog:
+    """
+    Column store holding one NumPy array per attribute.
+
+    Arrays are allocated with spare rows; an append fills the next free row and
+    the capacity doubles when it runs out, so n appends cost O(n) in total
+    instead of rebuilding the arrays from lists after every new object.
+    """
+
+    def __init__(self, columns, capacity=16):
+        """
+        Args:
+            columns: Mapping of column name to (dtype, shape of one row).
+            capacity: Rows allocated up front.
+        """
+        self._columns = {
+            name: np.zeros((capacity, *shape), dtype=dtype) for name, (dtype, shape) in columns.items()
+        }
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        """View of a column's filled rows."""
+        return self._columns[name][:self.size]
+
+    def columns(self):
+        return list(self._columns)
+
+    def _reserve(self, rows):
+        capacity = len(next(iter(self._columns.values())))
+        if self.size + rows <= capacity:
+            return
+
+        capacity = max(capacity * 2, self.size + rows)
+        for name, column in self._columns.items():
+            grown = np.zeros((capacity, *column.shape[1:]), dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._columns[name] = grown
+
+    def append(self, **row):
+        """Add one row and return its index."""
+        self._reserve(1)
+        for name, value in row.items():
+            self._columns[name][self.size] = value
+        self.size += 1
+        return self.size - 1
+
+    def extend(self, **columns):
+        """Add as many rows as the given arrays are long and return the index of the first."""
+        rows = len(next(iter(columns.values())))
+        self._reserve(rows)
+        for name, values in columns.items():
+            self._columns[name][self.size:self.size + rows] = values
+        self.size += rows
+        return self.size - rows
+
+    def save_npz(self, path):
+        """Write the filled rows to a .npz file, one array per column; object columns are stored as strings."""
+        np.savez(path, **{
+            name: self[name].astype(str) if self[name].dtype == object else self[name] for name in self._columns
+        })
+
+    def load_npz(self, path):
+        """Append the rows of a .npz file written by save_npz and return the index of the first."""
+        with np.load(path) as data:
+            return self.extend(**{name: data[name] for name in self._columns})
+
+
 class Show:
     """
     Represents a TV show, including its name, categories, stars, and release year.
     """
     all_categories = ["action", "comedy", "adventure", "tragedy", "romance"]
-    all_shows_cat_list = []
-    all_shows_stars_list = []
-    all_shows_names_list = []
-    sum_all_list = []
     all_shows = []
+    catalog = Catalog({
+        'name': (object, ()),
+        'categories': (float, (len(all_categories),)),
+        'stars': (float, ()),
+        'release_year': (int, ()),
+        'category_sum': (float, ()),
+    })
+    index = None  # ShowIndex kept up to date as shows are created
 
     def __init__(self, name, categories, stars=2.5, release_year=2000):
         self.__name = name
@@ -21,12 +97,22 @@ class Show:
         self.__stars = stars
         self.__release_year = release_year
 
-        # Add show to class-level collections (lists)
+        # The object list backs Show.all(); every column lives in Show.catalog only
         Show.all_shows.append(self)
-        Show.all_shows_cat_list.append(self.__categories)
-        Show.all_shows_stars_list.append(self.__stars)
-        Show.all_shows_names_list.append(self.__name)
-        Show.sum_all_list.append(np.sum(self.__categories))
+        self.__row = Show.catalog.append(
+            name=name,
+            categories=self.__categories,
+            stars=stars,
+            release_year=release_year,
+            category_sum=np.sum(self.__categories),
+        )
+        if Show.index is not None:
+            Show.index.add(self.__row)
+
+    @property
+    def row(self):
+        """Index of this show in Show.catalog."""
+        return self.__row
 
     @property
     def stars(self):
@@ -35,6 +121,7 @@ class Show:
     @stars.setter
     def stars(self, value):
         self.__stars = value
+        Show.catalog['stars'][self.__row] = value
 
     def get_name(self):
         return self.__name
@@ -66,12 +153,14 @@ class Show:
     @classmethod
     def convert_to_numpy(cls):
         """
-        Convert class-level lists to Numpy arrays for efficient computation.
+        Expose the catalog columns under their old array names, for older callers.
+
+        Nothing in this module needs it: everything reads Show.catalog, which is always current.
         """
-        cls.all_shows_cat = np.array(cls.all_shows_cat_list, dtype=float)
-        cls.all_shows_stars = np.array(cls.all_shows_stars_list, dtype=float)
-        cls.all_shows_names = np.array(cls.all_shows_names_list, dtype=str)
-        cls.sum_all = np.array(cls.sum_all_list, dtype=int)
+        cls.all_shows_cat = cls.catalog['categories']
+        cls.all_shows_stars = cls.catalog['stars']
+        cls.all_shows_names = cls.catalog['name'].astype(str)
+        cls.sum_all = cls.catalog['category_sum'].astype(int)
 
 
 class User:
@@ -79,6 +168,12 @@ class User:
     Represents a user, including their name, preferences, birth year, and gender.
     """
     all_users = []
+    catalog = Catalog({
+        'name': (object, ()),
+        'preferences': (float, (len(Show.all_categories),)),
+        'birth_year': (int, ()),
+        'gender': (bool, ()),
+    })
 
     def __init__(self, name, preferences, birth_year, gender=True):
         self.__name = name
@@ -88,12 +183,24 @@ class User:
 
         # Add user to class-level collections
         User.all_users.append(self)
+        self.__row = User.catalog.append(
+            name=name, preferences=self.__preferences, birth_year=birth_year, gender=gender
+        )
 
-    def age(self):
-        """Calculate the user's age based on the current year."""
-        current_year = 2024  # Assuming the current year is 2024
+    @property
+    def row(self):
+        """Index of this user in User.catalog."""
+        return self.__row
+
+    def age(self, current_year=None):
+        """Calculate the user's age in `current_year`, this year by default."""
+        if current_year is None:
+            current_year = date.today().year
         return current_year - self.__birth_year
 
+    def get_birth_year(self):
+        return self.__birth_year
+
     def get_preferences(self):
         return self.__preferences
 
@@ -108,6 +215,107 @@ class User:
         return cls.all_users
 
 
+class ShowIndex:
+    """
+    Approximate top-k inner product search over catalog vectors (an IVF index).
+
+    Training runs k-means to split the vectors into `nlist` cells. A query only
+    scores the vectors in the `nprobe` cells whose centroids have the largest
+    inner product with it, so raising nprobe trades speed for recall, up to an
+    exact search at nprobe == nlist. Rows added after training go straight
+    into their nearest cell; rows added before are kept until train().
+    """
+
+    def __init__(self, catalog=None, column='categories', nlist=64, nprobe=8, seed=7):
+        """
+        Args:
+            catalog: Catalog holding the vectors, Show.catalog by default.
+            column: Name of the vector column.
+            nlist: Number of k-means cells.
+            nprobe: Cells scored per query unless search() says otherwise.
+            seed: Seed for picking the initial centroids.
+        """
+        self.catalog = Show.catalog if catalog is None else catalog
+        self.column = column
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.rng = np.random.default_rng(seed)
+        self.centroids = None
+        self.cells = []
+
+    def _vectors(self, rows=None):
+        vectors = self.catalog[self.column]
+        return vectors if rows is None else vectors[rows]
+
+    def _nearest(self, vectors):
+        """Index of the closest centroid for each vector."""
+        distances = (
+            np.einsum('ij,ij->i', vectors, vectors)[:, None]
+            - 2 * vectors @ self.centroids.T
+            + np.einsum('ij,ij->i', self.centroids, self.centroids)[None, :]
+        )
+        return np.argmin(distances, axis=1)
+
+    def train(self, iterations=10):
+        """Cluster every row currently in the catalog and rebuild the cells."""
+        vectors = self._vectors()
+        if not len(vectors):
+            raise ValueError("Can't train an index on an empty catalog")
+
+        nlist = min(self.nlist, len(vectors))
+        self.centroids = vectors[self.rng.choice(len(vectors), nlist, replace=False)].astype(float)
+        for _ in range(iterations):
+            labels = self._nearest(vectors)
+            counts = np.bincount(labels, minlength=nlist)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, vectors)
+            filled = counts > 0  # an empty cell keeps its old centroid
+            self.centroids[filled] = sums[filled] / counts[filled, None]
+
+        labels = self._nearest(vectors)
+        order = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[order], np.arange(nlist + 1))
+        self.cells = []
+        for cell in range(nlist):
+            rows = Catalog({'row': (int, ())}, capacity=max(bounds[cell + 1] - bounds[cell], 1))
+            rows.extend(row=order[bounds[cell]:bounds[cell + 1]])
+            self.cells.append(rows)
+        return self
+
+    def add(self, row):
+        """Index a row appended to the catalog; before training there is nothing to do, train() reads every row."""
+        if self.centroids is None:
+            return
+        cell = self._nearest(self._vectors([row]))[0]
+        self.cells[cell].append(row=row)
+
+    def search(self, query, k=10, nprobe=None):
+        """
+        Args:
+            query: Vector to score the catalog rows against.
+            k: Number of rows returned.
+            nprobe: Cells to scan, self.nprobe by default.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Catalog rows and their inner products, best first.
+        """
+        if self.centroids is None:
+            self.train()
+        nprobe = min(self.nprobe if nprobe is None else nprobe, len(self.centroids))
+
+        closeness = self.centroids @ query
+        probed = np.argpartition(-closeness, nprobe - 1)[:nprobe]
+        candidates = np.concatenate([self.cells[cell]['row'] for cell in probed])
+
+        scores = self._vectors(candidates) @ query
+        if k < len(candidates):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.lexsort((candidates[top], -scores[top]))]
+        return candidates[top], scores[top]
+
+
 def all_recommendations(user):
     """
     Generate and return a sorted list of recommended shows for a specific user based on their preferences.
@@ -123,13 +331,14 @@ def all_recommendations(user):
     user_preferences = user.get_preferences()
 
     # Calculate recommendation scores using dot product of user preferences and show categories
+    categories = Show.catalog['categories']
     if np.count_nonzero(user_preferences) > 0:
-        scores = Show.all_shows_cat.dot(user_preferences) / np.count_nonzero(user_preferences)
+        scores = categories.dot(user_preferences) / np.count_nonzero(user_preferences)
     else:
-        scores = np.zeros(len(Show.all_shows_cat))  # Handle case where user preferences are all zeroes
+        scores = np.zeros(len(categories))  # Handle case where user preferences are all zeroes
 
     # Combine show names with their respective scores
-    recommendations = list(zip(Show.all_shows_names, scores))
+    recommendations = list(zip(Show.catalog['name'], scores))
 
     # Sort recommendations based on score in descending order
     recommendations.sort(key=lambda x: x[1], reverse=True)
@@ -140,6 +349,55 @@ def all_recommendations(user):
     return recommendations
 
 
+def recommend_many(users=None, k=10, batch_size=1024):
+    """
+    Generate the top-k recommended shows for many users at once.
+
+    Scores come from one user x show matrix product per batch of users, and
+    np.argpartition picks each row's top k without sorting the whole catalog.
+
+    Args:
+        users: Users or User.catalog rows to score; every user in the catalog by default.
+        k: Number of shows kept per user.
+        batch_size: Users scored per matrix product, bounding memory to batch_size x shows scores.
+
+    Returns:
+        list[list[tuple[str, float]]]: For each user, like all_recommendations but cut to the best k.
+    """
+    if users is None:
+        rows = np.arange(len(User.catalog))
+    else:
+        rows = np.array([user.row if isinstance(user, User) else user for user in users], dtype=int)
+
+    categories = Show.catalog['categories']
+    names = Show.catalog['name']
+    k = min(k, len(categories))
+
+    recommendations = []
+    for start in range(0, len(rows), batch_size):
+        preferences = User.catalog['preferences'][rows[start:start + batch_size]]
+        scores = preferences @ categories.T
+        # Users without preferences score zero everywhere, as in all_recommendations
+        scores /= np.maximum(np.count_nonzero(preferences, axis=1), 1)[:, None]
+
+        if k < len(categories):
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(len(categories)), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        # Best score first, ties in catalog order
+        order = np.lexsort((top, -top_scores))
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        recommendations.extend(
+            [(str(names[show]), round(float(score), 2)) for show, score in zip(show_row, score_row)]
+            for show_row, score_row in zip(top, top_scores)
+        )
+
+    return recommendations
+
+
 def recommendation(show, user):
     """
     Determine if a specific show is recommended for a specific user.
@@ -151,7 +409,8 @@ def recommendation(show, user):
     Returns:
         A tuple containing a boolean recommendation and a message.
     """
-    if user.age() < (2024 - show.get_release_year()):
+    # age < current year - release year, whatever the current year is
+    if user.get_birth_year() > show.get_release_year():
         return False, f"{user.get_name()}'s age is too low for watching {show.get_name()}"
 
     user_prefs = user.get_preferences()
@@ -163,6 +422,194 @@ def recommendation(show, user):
     return False, f"{show.get_name()} has a low score, not recommended for {user.get_name()}"
 
 
+# Reason codes returned by recommendation_masks
+RECOMMENDED, TOO_YOUNG, LOW_SCORE = 0, 1, 2
+
+
+def recommendation_masks(users=None):
+    """
+    Vectorized recommendation() for many users over the whole catalog.
+
+    Args:
+        users: Users or User.catalog rows to check; every user in the catalog by default.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: A users x shows boolean mask of recommended shows, and a users x shows
+                                       array of reason codes (RECOMMENDED, TOO_YOUNG or LOW_SCORE).
+    """
+    if users is None:
+        rows = np.arange(len(User.catalog))
+    else:
+        rows = np.array([user.row if isinstance(user, User) else user for user in users], dtype=int)
+
+    preferences = User.catalog['preferences'][rows]
+    birth_years = User.catalog['birth_year'][rows]
+    shows = Show.catalog
+
+    # Too young means age < current year - release year, i.e. born after the show came out
+    too_young = birth_years[:, None] > shows['release_year'][None, :]
+
+    scores = preferences @ shows['categories'].T
+    scores /= np.maximum(np.count_nonzero(preferences, axis=1), 1)[:, None]
+    good_score = scores * (shows['stars'] / 5) > shows['category_sum']
+
+    recommended = ~too_young & good_score
+    reasons = np.where(too_young, TOO_YOUNG, np.where(good_score, RECOMMENDED, LOW_SCORE)).astype(np.int8)
+    return recommended, reasons
+
+
+def recommended_shows(user):
+    """Names of every show recommendation() would recommend for `user`."""
+    recommended, _ = recommendation_masks([user])
+    return [str(name) for name in Show.catalog['name'][recommended[0]]]
+
+
+def approximate_recommendations(user, k=10, nprobe=None):
+    """
+    all_recommendations cut to the best k, found through Show.index instead of scoring every show.
+
+    Args:
+        user (User): The user object for whom recommendations are generated.
+        k: Number of shows returned.
+        nprobe: Index cells scanned, the index default if None.
+
+    Returns:
+        list[tuple[str, float]]: Show names and scores, best first.
+    """
+    if Show.index is None:
+        Show.index = ShowIndex()
+    preferences = user.get_preferences()
+    rows, scores = Show.index.search(preferences, k, nprobe)
+    scores = scores / max(np.count_nonzero(preferences), 1)
+    return [(str(Show.catalog['name'][row]), round(float(score), 2)) for row, score in zip(rows, scores)]
+
+
+def benchmark_index(num_shows=200_000, num_queries=200, k=10, nlist=256, nprobes=(1, 2, 4, 8, 16, 32), seed=7):
+    """
+    Print recall@k and latency of ShowIndex against exact search on random show vectors.
+
+    The vectors live in their own Catalog, so Show.catalog is left untouched.
+    """
+    rng = np.random.default_rng(seed)
+    dimensions = len(Show.all_categories)
+    catalog = Catalog({'categories': (float, (dimensions,))}, capacity=num_shows)
+    catalog.extend(categories=rng.integers(0, 11, (num_shows, dimensions)) * (rng.random((num_shows, dimensions)) < .5))
+    queries = rng.integers(0, 11, (num_queries, dimensions)).astype(float)
+
+    start = time.perf_counter()
+    index = ShowIndex(catalog, nlist=nlist, seed=seed).train()
+    print(f'{num_shows} shows, trained {nlist} cells in {time.perf_counter() - start:.2f} s')
+
+    start = time.perf_counter()
+    exact = []
+    for query in queries:
+        scores = catalog['categories'] @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        exact.append(scores[top].min())  # anything scoring at least the kth best is a hit
+    exact_ms = (time.perf_counter() - start) * 1000 / num_queries
+    print(f'{"exact":>10} recall 1.000 {exact_ms:8.3f} ms/query')
+
+    for nprobe in nprobes:
+        start = time.perf_counter()
+        found = [index.search(query, k, nprobe)[1] for query in queries]
+        elapsed_ms = (time.perf_counter() - start) * 1000 / num_queries
+        recall = np.mean([np.sum(scores >= kth) / k for scores, kth in zip(found, exact)])
+        print(f'{f"nprobe={nprobe}":>10} recall {recall:.3f} {elapsed_ms:8.3f} ms/query')
+
+
+def iter_records(path, chunk_size=1 << 16):
+    """
+    Yield the records of a JSON array file or of an NDJSON file (one object per line) one at a time.
+
+    Arrays are decoded incrementally from chunk_size reads, so the whole file is never held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as file:
+        buffer = file.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            file.seek(0)
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip().removeprefix(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer += chunk
+                continue
+            yield record
+            buffer = buffer[end:]
+
+
+def _show_columns(records):
+    categories = [record.get('categories', {}) for record in records]
+    columns = {
+        'name': np.array([record.get('name') for record in records], dtype=object),
+        'categories': np.array(
+            [[weights.get(category, 0) for category in Show.all_categories] for weights in categories], dtype=float
+        ).reshape(len(records), len(Show.all_categories)),
+        'stars': np.array([record.get('stars', 2.5) for record in records], dtype=float),
+        'release_year': np.array([record.get('release_year', 2000) for record in records], dtype=int),
+    }
+    columns['category_sum'] = columns['categories'].sum(axis=1)
+    return columns
+
+
+def _user_columns(records):
+    # save() writes the preference vector under 'categories'
+    preferences = [record.get('preferences', record.get('categories', {})) for record in records]
+    return {
+        'name': np.array([record.get('name') for record in records], dtype=object),
+        'preferences': np.array(
+            [[weights.get(category, 0) for category in Show.all_categories] for weights in preferences], dtype=float
+        ).reshape(len(records), len(Show.all_categories)),
+        'birth_year': np.array([record.get('birth_year') for record in records], dtype=int),
+        'gender': np.array([record.get('gender', True) for record in records], dtype=bool),
+    }
+
+
+def load_columns(path, obj_type, batch_size=10_000):
+    """
+    Stream a JSON or NDJSON file straight into obj_type.catalog, batch_size rows per append.
+
+    No Show or User objects are created, so the rows are only reachable through the catalog
+    (and Show.index, which is kept up to date).
+
+    Args:
+        path: The file path from which to read the data.
+        obj_type: User or Show.
+
+    Returns:
+        range: The catalog rows that were loaded.
+    """
+    to_columns = _show_columns if obj_type == Show else _user_columns
+    first = len(obj_type.catalog)
+
+    batch = []
+    for record in iter_records(path):
+        batch.append(record)
+        if len(batch) == batch_size:
+            obj_type.catalog.extend(**to_columns(batch))
+            batch = []
+    if batch:
+        obj_type.catalog.extend(**to_columns(batch))
+
+    rows = range(first, len(obj_type.catalog))
+    if obj_type == Show and Show.index is not None:
+        for row in rows:
+            Show.index.add(row)
+    return rows
+
+
 def read(path, obj_type):
     """
     Load JSON data from a file and convert it into objects of the specified type.
@@ -174,11 +621,8 @@ def read(path, obj_type):
     Returns:
         A list of objects of the specified type.
     """
-    with open(path, 'r') as file:
-        data = json.load(file)
-
     objects = []
-    for item in data:
+    for item in iter_records(path):
         if obj_type == User:
             user = User(
                 name=item.get('name'),
@@ -201,7 +645,7 @@ def read(path, obj_type):
 
 def _get_class_name(obj):
     """
-    Generate a class name string using regular expressions to extract the class name.
+    Generate the name-mangling prefix of the object's class.
 
     Args:
         obj: An instance of a class.
@@ -209,8 +653,7 @@ def _get_class_name(obj):
     Returns:
         A formatted string representing the class name.
     """
-    class_name = re.sub(r"<class '__main__\.(\w+)'>", r'_\1__', str(obj.__class__))
-    return class_name
+    return f"_{type(obj).__name__}__"
 
 
 def save(obj, path):
@@ -231,6 +674,8 @@ def save(obj, path):
             data = {'ID': index}
 
             for key, value in info.items():
+                if key == f'{class_prefix}row':
+                    continue
                 if not isinstance(value, np.ndarray):
                     data[key.removeprefix(class_prefix)] = value
                 else:
@@ -248,7 +693,6 @@ s3 = Show("Your Lie in April", {"romance": 10, "tragedy": 10}, 4.5, 2014)
 s4 = Show("The Dark Knight", {"action": 9, "tragedy": 7}, 5.0, 2008)
 s5 = Show("Dumb and Dumber", {"comedy": 10, "adventure": 4}, 3, 1994)
 s6 = Show("FM A BH", {"tragedy": 9, "comedy": 5, "action": 100}, 4, 2023)
-Show.convert_to_numpy()
 u1 = User("Mohammad", {"comedy": 10, "romance": 9}, 2004, False)
 u2 = User("Hamza", {"action": 7, "comedy": 6, "adventure": 10}, 2006, False)
 u3 = User("Soso", {"tragedy": 7, "romance": 10}, 2000)
@@ -256,6 +700,7 @@ u3 = User("Soso", {"tragedy": 7, "romance": 10}, 2000)
 print(all_recommendations(u1))
 print(all_recommendations(u2))
 print(all_recommendations(u3))
+print(recommend_many(k=3))
 
 save(u1, 'User.json')
 save(s1, 'Show.json')
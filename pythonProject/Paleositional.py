@@ -1,11 +1,23 @@
 import itertools
-from typing import List, Dict
+import multiprocessing
+from bisect import bisect_left
+from typing import List, Dict, Iterator, NamedTuple, Optional, Tuple
 from pprint import pprint
 
 import numpy as np
 import pandas as pd
 
 
+OPERATORS = ['~', '&', '^', '|', '-', '=']
+
+# In place numpy kernels of the symmetric binary operators
+NUMPY_OPS = {
+    "&": np.bitwise_and,
+    "|": np.bitwise_or,
+    "^": np.bitwise_xor,
+}
+
+
 def precedence(op: str) -> int:
     return {
         '~': 5,
@@ -31,7 +43,7 @@ def infix_to_postfix(expression: str) -> List[str]:
                 output.append(current_str)
                 current_str = ""
 
-            if char in ['~', '&', '^', '|', '-', '=']:
+            if char in OPERATORS:
                 while operators and precedence(operators[-1]) >= precedence(char):
                     output.append(operators.pop())
                 operators.append(char)
@@ -55,19 +67,53 @@ def infix_to_postfix(expression: str) -> List[str]:
     return output
 
 
+def compile_plan(post_expression: List[str], expression: str = "") -> Tuple[List[Tuple[str, str, Tuple[str, ...]]], str]:
+    """
+    Turn a postfix expression into its unique steps and the key of the result.
+
+    A step is (key, operator, operand keys). Keys are the sub-expressions written
+    with full parentheses, so equal keys mean equal structure: a sub-expression
+    that shows up twice is one step, and `(a|b)&c` can't clash with `a|(b&c)`.
+    """
+    plan: List[Tuple[str, str, Tuple[str, ...]]] = []
+    seen = set()
+    stack: List[Tuple[str, bool]] = []  # (key, needs parentheses as an operand)
+
+    for elem in post_expression:
+        if elem not in OPERATORS:
+            stack.append((elem, False))
+            continue
+
+        try:
+            operands = [stack.pop()] if elem == "~" else list(reversed([stack.pop(), stack.pop()]))
+        except IndexError:
+            raise Exception(f"Invalid expression: {expression}, Nuh uh") from None
+
+        names = [f"({key})" if compound else key for key, compound in operands]
+        key = f"~{names[0]}" if elem == "~" else f"{names[0]}{elem}{names[1]}"
+        if key not in seen:
+            seen.add(key)
+            plan.append((key, elem, tuple(key for key, _ in operands)))
+        stack.append((key, elem != "~"))
+
+    if len(stack) != 1:
+        raise Exception(f"Invalid expression: {expression}, Nuh uh")
+    return plan, stack[0][0]
+
+
 class PExp:
     def __init__(self, expression: str) -> None:
         self._expression: str = expression
         self._post_expression: List[str] = infix_to_postfix(expression)
+        self._plan, self._root_key = compile_plan(self._post_expression, expression)
         self._key_elements: Dict[str, np.ndarray] = self._build_table()
         self._num_var: int
 
     def vars(self) -> List[str]:
-        seen = {}
-        return [
+        return list(dict.fromkeys(
             s for s in self.post_expression
-            if any(c.isalnum() for c in s) and not seen.setdefault(s, False)
-        ]
+            if any(c.isalnum() for c in s)
+        ))
 
     def _build_table(self) -> Dict[str, np.ndarray]:
         rizz: Dict[str, np.ndarray] = {}
@@ -107,49 +153,55 @@ class PExp:
         rizz = dict(zip(self._key_elements.keys(), [arr.tolist() for arr in self._key_elements.values()]))
         return rizz
 
-    def apply_op(self, elem: str, lift: str, right: str) -> np.ndarray[bool]:
-        if elem == "&":
-            rizz = self._key_elements[lift] & self._key_elements[right]
-        elif elem == "|":
-            rizz = self._key_elements[lift] | self._key_elements[right]
-        elif elem == "^":
-            rizz = self._key_elements[lift] ^ self._key_elements[right]
-        elif elem == "=":
-            rizz = self._key_elements[lift] == self._key_elements[right]
-        elif elem == "-":
-            rizz = ~self._key_elements[lift] | self._key_elements[right]
-        else:
-            raise Exception(f"Invalid expression: {self._expression}, Nuh uh")
-        return rizz
-
-    def solve(self) -> 'PExp':
-        solve_stack: List[str] = []
-        for elem in self._post_expression:
-            if elem in self._key_elements:
-                solve_stack.append(elem)
-                continue
-
-            right: str = solve_stack.pop()
-
-            if elem == "~":
-                value = ~self._key_elements[right]
-                key: str = f"~{right}"
-            else:
-                lift: str = solve_stack.pop()
-                key = f"{lift}{elem}{right}"
-                value = self.apply_op(elem, lift, right)
-
-            self._key_elements.update({
-                key: value
-            })
-            solve_stack.append(key)
-
-        if not solve_stack:
-            raise Exception(f"Invalid expression: {self._expression}, Nuh uh")
+    @property
+    def plan(self) -> List[Tuple[str, str, Tuple[str, ...]]]:
+        """Steps `solve` runs, in order: (column, operator, operand columns)."""
+        return self._plan
 
+    def solve(self, keep_intermediates: bool = True) -> 'PExp':
+        self._evaluate(keep_intermediates)
         self._df = self._to_pandas()
         return self
 
+    def _new_buffer(self) -> np.ndarray:
+        return np.empty(2 ** self._num_var, dtype=bool)
+
+    def _kernel(self, op: str, args: List[np.ndarray], out: np.ndarray) -> None:
+        if op == "~":
+            np.invert(args[0], out=out)
+        elif op == "-":
+            np.invert(args[0], out=out)
+            np.bitwise_or(out, args[1], out=out)
+        elif op == "=":
+            np.equal(args[0], args[1], out=out)
+        else:
+            NUMPY_OPS[op](args[0], args[1], out=out)
+
+    def _evaluate(self, keep_intermediates: bool = True) -> None:
+        """
+        Run the plan, writing every step into its own buffer in place.
+
+        Without `keep_intermediates` only the variables and the result are kept
+        and a step's buffer is handed on once its last reader has run.
+        """
+        last_use: Dict[str, int] = {}
+        for i, (_, _, operands) in enumerate(self._plan):
+            for operand in operands:
+                last_use[operand] = i
+
+        variables = set(self.vars())
+        free: List[np.ndarray] = []
+        for i, (key, op, operands) in enumerate(self._plan):
+            out = free.pop() if free else self._new_buffer()
+            self._kernel(op, [self._key_elements[operand] for operand in operands], out)
+            self._key_elements[key] = out
+
+            if keep_intermediates:
+                continue
+            for operand in set(operands):
+                if last_use[operand] == i and operand != self._root_key and operand not in variables:
+                    free.append(self._key_elements.pop(operand))
+
     def show(self) -> 'PExp':
         pprint(self._key_elements)
         return self
@@ -159,7 +211,7 @@ class PExp:
         return self
 
     def final_answer(self) -> np.ndarray[bool]:
-        return list(self._key_elements.items())[-1][1]
+        return self._key_elements[self._root_key]
 
     def _to_pandas(self) -> pd.DataFrame:
         return pd.DataFrame(self._key_elements)
@@ -183,10 +235,518 @@ class PExp:
             return False
 
 
+WORD_BITS = 64
+ALL_ONES = np.uint64(0xFFFF_FFFF_FFFF_FFFF)
+
+# Bit b of PATTERNS[s] is set when bit s of b is 0, that's the column of a
+# variable whose True/False blocks are 2 ** s rows long, 64 rows at a time
+PATTERNS = [
+    np.uint64(0x5555_5555_5555_5555),
+    np.uint64(0x3333_3333_3333_3333),
+    np.uint64(0x0F0F_0F0F_0F0F_0F0F),
+    np.uint64(0x00FF_00FF_00FF_00FF),
+    np.uint64(0x0000_FFFF_0000_FFFF),
+    np.uint64(0x0000_0000_FFFF_FFFF),
+]
+
+
+def num_words(num_var: int) -> int:
+    return max(1, (1 << num_var) // WORD_BITS)
+
+
+def tail_mask(num_var: int) -> np.uint64:
+    """Bits of the (only) word that hold rows when the table has fewer than 64 rows."""
+    rows = 1 << num_var
+    return ALL_ONES if rows >= WORD_BITS else np.uint64((1 << rows) - 1)
+
+
+def packed_column(num_var: int, index: int, start_word: int = 0, count: int = None) -> np.ndarray:
+    """
+    Words [start_word, start_word + count) of the column of the `index`-th (1-based) sorted variable.
+
+    Same rows as `PExp._build_col`, row r being bit r % 64 of word r // 64.
+    """
+    if count is None:
+        count = num_words(num_var) - start_word
+
+    shift = num_var - index
+    if shift >= 6:
+        words = np.arange(start_word, start_word + count, dtype=np.uint64)
+        col = np.where((words >> np.uint64(shift - 6)) & np.uint64(1), np.uint64(0), ALL_ONES)
+    else:
+        col = np.full(count, PATTERNS[shift], dtype=np.uint64)
+
+    return col & tail_mask(num_var)
+
+
+def popcount(words: np.ndarray) -> int:
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.astype("<u8").view(np.uint8)).sum())
+
+
+def unpack(words: np.ndarray, rows: int) -> np.ndarray:
+    return np.unpackbits(words.astype("<u8").view(np.uint8), bitorder="little")[:rows].astype(bool)
+
+
+# Binary operators on packed words; `mask` keeps negations out of the unused tail bits
+PACKED_OPS = {
+    "&": lambda a, b, mask: a & b,
+    "|": lambda a, b, mask: a | b,
+    "^": lambda a, b, mask: a ^ b,
+    "=": lambda a, b, mask: ~(a ^ b) & mask,
+    "-": lambda a, b, mask: (~a & mask) | b,
+}
+
+
+def take_rows(words: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Values of the given row numbers, without unpacking the rest of the column."""
+    rows = rows.astype(np.uint64)
+    return ((words[rows >> np.uint64(6)] >> (rows & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+
+class PackedPExp(PExp):
+    """
+    PExp whose columns are bit-packed into uint64 words.
+
+    Every operator handles 64 rows per numpy element and each column takes
+    2 ** n / 8 bytes instead of 2 ** n, so tables with a few more variables fit
+    in memory. The pandas table is only built when it is asked for.
+    """
+
+    def _build_table(self) -> Dict[str, np.ndarray]:
+        variables = sorted(self.vars())
+        self._num_var = len(variables)
+        self._mask = tail_mask(self._num_var)
+        return {
+            var: packed_column(self._num_var, i)
+            for i, var in enumerate(variables, start=1)
+        }
+
+    @property
+    def num_rows(self) -> int:
+        return 1 << self._num_var
+
+    @property
+    def key_elements(self) -> Dict[str, List[bool]]:
+        return {key: unpack(arr, self.num_rows).tolist() for key, arr in self._key_elements.items()}
+
+    def solve(self, keep_intermediates: bool = True) -> 'PackedPExp':
+        self._evaluate(keep_intermediates)
+        return self
+
+    def _new_buffer(self) -> np.ndarray:
+        return np.empty(num_words(self._num_var), dtype=np.uint64)
+
+    def _kernel(self, op: str, args: List[np.ndarray], out: np.ndarray) -> None:
+        if op == "~":
+            np.invert(args[0], out=out)
+        elif op == "-":
+            np.invert(args[0], out=out)
+            np.bitwise_and(out, self._mask, out=out)
+            np.bitwise_or(out, args[1], out=out)
+        elif op == "=":
+            np.bitwise_xor(args[0], args[1], out=out)
+            np.invert(out, out=out)
+        else:
+            NUMPY_OPS[op](args[0], args[1], out=out)
+            return
+        np.bitwise_and(out, self._mask, out=out)
+
+    @property
+    def _df(self) -> pd.DataFrame:
+        return self._to_pandas()
+
+    def _to_pandas(self) -> pd.DataFrame:
+        return pd.DataFrame({key: unpack(arr, self.num_rows) for key, arr in self._key_elements.items()})
+
+    def count(self) -> int:
+        """Number of rows where the expression is true."""
+        return popcount(self.final_answer())
+
+    def __eq__(self, other: 'PExp') -> bool:
+        # Every table under 64 rows packs into one word, so equal words alone don't mean equal tables
+        if not isinstance(other, PackedPExp):
+            return False
+        if self._num_var != other._num_var or sorted(self.vars()) != sorted(other.vars()):
+            return False
+        return bool(np.array_equal(self.final_answer(), other.final_answer()))
+
+    def where(self, **kwargs) -> pd.DataFrame:
+        con: np.ndarray = np.full(num_words(self._num_var), self._mask, dtype=np.uint64)
+
+        for k, v in kwargs.items():
+            con &= self._key_elements[k] if v else ~self._key_elements[k] & self._mask
+
+        rows = np.flatnonzero(unpack(con, self.num_rows))
+        return pd.DataFrame(
+            {key: take_rows(arr, rows) for key, arr in self._key_elements.items()},
+            index=rows,
+        ).astype("int8")
+
+
+class BlockTask(NamedTuple):
+    """One block of a PExpStream, as sent to the worker processes."""
+    plan: List[Tuple[str, str, Tuple[str, ...]]]
+    root: str
+    variables: List[str]
+    start_word: int
+    count: int
+    where: Dict[str, bool]
+
+
+def _eval_block(
+        plan: List[Tuple[str, str, Tuple[str, ...]]], root: str, variables: List[str],
+        start_word: int, count: int, where: Dict[str, bool]
+) -> np.ndarray:
+    """Packed value of the expression over one block of words, zeroed where `where` doesn't hold."""
+    num_var = len(variables)
+    mask = tail_mask(num_var)
+    index = {var: i for i, var in enumerate(variables, start=1)}
+
+    values: Dict[str, np.ndarray] = {
+        var: packed_column(num_var, i, start_word, count) for var, i in index.items()
+    }
+    for key, op, operands in plan:
+        if op == "~":
+            values[key] = ~values[operands[0]] & mask
+        else:
+            values[key] = PACKED_OPS[op](values[operands[0]], values[operands[1]], mask)
+
+    value = values[root]
+    for var, wanted in where.items():
+        col = packed_column(num_var, index[var], start_word, count)
+        value = value & (col if wanted else ~col & mask)
+    return value
+
+
+def _count_block(task: BlockTask) -> int:
+    return popcount(_eval_block(*task))
+
+
+def _first_block(task: BlockTask) -> int:
+    words = _eval_block(*task)
+    hits = np.flatnonzero(words)
+    if not len(hits):
+        return -1
+    word = int(words[hits[0]])
+    return (task.start_word + int(hits[0])) * WORD_BITS + (word & -word).bit_length() - 1
+
+
+class PExpStream:
+    """
+    Truth table of an expression evaluated block by block, never held whole.
+
+    Each block of `block_rows` rows has its variable columns generated from its
+    position and is run through the postfix expression in packed form, so
+    memory stays at a few blocks whatever the number of variables. `count` and
+    `first_model` can spread the blocks over `processes` worker processes.
+    """
+
+    def __init__(self, expression: str, block_rows: int = 1 << 20, processes: Optional[int] = None) -> None:
+        self._expression: str = expression
+        self._post_expression: List[str] = infix_to_postfix(expression)
+        self._plan, self._root_key = compile_plan(self._post_expression, expression)
+        self._variables: List[str] = sorted(PExp.vars(self))
+        self._num_var: int = len(self._variables)
+        self._block_words: int = max(1, block_rows // WORD_BITS)
+        self.processes: Optional[int] = processes
+
+    @property
+    def expression(self) -> str:
+        return self._expression
+
+    @property
+    def post_expression(self) -> List[str]:
+        return self._post_expression
+
+    @property
+    def num_rows(self) -> int:
+        return 1 << self._num_var
+
+    def vars(self) -> List[str]:
+        return self._variables
+
+    def _tasks(self, where: Dict[str, bool]) -> Iterator[BlockTask]:
+        unknown = set(where) - set(self._variables)
+        if unknown:
+            raise KeyError(f"Not variables of {self._expression}: {sorted(unknown)}")
+
+        total = num_words(self._num_var)
+        for start in range(0, total, self._block_words):
+            yield BlockTask(self._plan, self._root_key, self._variables, start, min(self._block_words, total - start), where)
+
+    def blocks(self, **where: bool) -> Iterator[Tuple[int, np.ndarray]]:
+        """(first row, packed values) for every block; rows that break `where` read as False."""
+        for task in self._tasks(where):
+            yield task.start_word * WORD_BITS, _eval_block(*task)
+
+    def assignment(self, row: int) -> Dict[str, bool]:
+        """Variable values of a row, in the same order as PExp's table."""
+        return {
+            var: not (row >> (self._num_var - i)) & 1
+            for i, var in enumerate(self._variables, start=1)
+        }
+
+    def count(self, **where: bool) -> int:
+        """Number of satisfying rows (among those matching `where`)."""
+        if self.processes and self.processes > 1:
+            with multiprocessing.Pool(self.processes) as pool:
+                return sum(pool.imap_unordered(_count_block, self._tasks(where), chunksize=4))
+        return sum(map(_count_block, self._tasks(where)))
+
+    def first_model(self, **where: bool) -> Optional[Dict[str, bool]]:
+        """Assignment of the first satisfying row, or None when there is none."""
+        if self.processes and self.processes > 1:
+            with multiprocessing.Pool(self.processes) as pool:
+                hits = pool.imap(_first_block, self._tasks(where))
+                row = next((hit for hit in hits if hit >= 0), -1)
+        else:
+            row = next((hit for hit in map(_first_block, self._tasks(where)) if hit >= 0), -1)
+
+        return None if row < 0 else self.assignment(row)
+
+    def where(self, **kwargs: bool) -> Iterator[Dict[str, bool]]:
+        """Like PExp.where, one row at a time: every row matching `kwargs` with the expression's value."""
+        for task in self._tasks({}):
+            start, count = task.start_word, task.count
+            value = unpack(_eval_block(*task), min(count * WORD_BITS, self.num_rows))
+
+            con = np.ones(len(value), dtype=bool)
+            for var, wanted in kwargs.items():
+                col = unpack(packed_column(self._num_var, self._variables.index(var) + 1, start, count), len(value))
+                con &= col == bool(wanted)
+
+            for offset in np.flatnonzero(con):
+                row = start * WORD_BITS + int(offset)
+                yield {**self.assignment(row), self._expression: bool(value[offset])}
+
+
+# Python versions of the binary operators, for terminal BDD nodes
+BOOL_OPS = {
+    "&": lambda a, b: a and b,
+    "|": lambda a, b: a or b,
+    "^": lambda a, b: a != b,
+    "=": lambda a, b: a == b,
+    "-": lambda a, b: (not a) or b,
+}
+
+
+class BDD:
+    """
+    Store of reduced ordered binary decision diagram nodes.
+
+    Node 0 is False and node 1 is True; every other node is a (level, low, high)
+    triple kept unique, so two formulas over the same store are equivalent
+    exactly when they end up as the same node. Variables are ordered by when
+    they were first registered.
+    """
+
+    TERMINAL = 1 << 30  # Level of the two leaves, below every variable
+
+    def __init__(self) -> None:
+        self._levels: Dict[str, int] = {}
+        self._nodes: List[Tuple[int, int, int]] = [(BDD.TERMINAL, 0, 0), (BDD.TERMINAL, 1, 1)]
+        self._unique: Dict[Tuple[int, int, int], int] = {}
+        self._cache: Dict[Tuple[str, int, int], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def level(self, name: str) -> int:
+        return self._levels.setdefault(name, len(self._levels))
+
+    def var(self, name: str) -> int:
+        return self._mk(self.level(name), 0, 1)
+
+    def node(self, u: int) -> Tuple[int, int, int]:
+        return self._nodes[u]
+
+    def _mk(self, level: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+
+        key = (level, low, high)
+        if (u := self._unique.get(key)) is None:
+            u = len(self._nodes)
+            self._nodes.append(key)
+            self._unique[key] = u
+        return u
+
+    def negate(self, u: int) -> int:
+        return self.apply("^", u, 1)
+
+    def apply(self, op: str, u: int, v: int) -> int:
+        if u < 2 and v < 2:
+            return int(BOOL_OPS[op](bool(u), bool(v)))
+        if op == "&" and (u == 0 or v == 0):
+            return 0
+        if op == "|" and (u == 1 or v == 1):
+            return 1
+
+        key = (op, u, v)
+        if (w := self._cache.get(key)) is not None:
+            return w
+
+        level_u, low_u, high_u = self._nodes[u]
+        level_v, low_v, high_v = self._nodes[v]
+        level = min(level_u, level_v)
+        if level_u != level:
+            low_u = high_u = u
+        if level_v != level:
+            low_v = high_v = v
+
+        w = self._mk(level, self.apply(op, low_u, low_v), self.apply(op, high_u, high_v))
+        self._cache[key] = w
+        return w
+
+    def from_postfix(self, post_expression: List[str], expression: str = "") -> int:
+        stack: List[int] = []
+        for elem in post_expression:
+            if elem not in BOOL_OPS and elem != "~":
+                stack.append(self.var(elem))
+                continue
+
+            try:
+                right = stack.pop()
+                stack.append(self.negate(right) if elem == "~" else self.apply(elem, stack.pop(), right))
+            except IndexError:
+                raise Exception(f"Invalid expression: {expression}, Nuh uh") from None
+
+        if len(stack) != 1:
+            raise Exception(f"Invalid expression: {expression}, Nuh uh")
+        return stack[0]
+
+
+class BExp:
+    """
+    PExp answered through a BDD instead of the truth table.
+
+    Satisfiability, equivalence and model counting cost the size of the
+    diagram rather than 2 ** n rows, so expressions with hundreds of variables
+    are fine as long as their diagram stays small.
+    """
+
+    def __init__(self, expression: str, manager: Optional[BDD] = None) -> None:
+        self._expression: str = expression
+        self._post_expression: List[str] = infix_to_postfix(expression)
+        appearance = PExp.vars(self)
+        self._variables: List[str] = sorted(appearance)
+        self.manager: BDD = manager if manager is not None else BDD()
+
+        # Levels go in order of first appearance, not alphabetical: variables used
+        # together stay close, which keeps formulas like (a&b)|(c&d)|... linear
+        for var in appearance:
+            self.manager.level(var)
+        self._root: int = self.manager.from_postfix(self._post_expression, expression)
+
+    @property
+    def expression(self) -> str:
+        return self._expression
+
+    @property
+    def post_expression(self) -> List[str]:
+        return self._post_expression
+
+    @property
+    def root(self) -> int:
+        return self._root
+
+    def vars(self) -> List[str]:
+        return self._variables
+
+    def satisfiable(self) -> bool:
+        return self._root != 0
+
+    def tautology(self) -> bool:
+        return self._root == 1
+
+    def _constrained(self, where: Dict[str, bool]) -> int:
+        root = self._root
+        for var, wanted in where.items():
+            if var not in self._variables:
+                raise KeyError(f"{var} is not a variable of {self._expression}")
+            literal = self.manager.var(var)
+            root = self.manager.apply("&", root, literal if wanted else self.manager.negate(literal))
+        return root
+
+    def count(self, **where: bool) -> int:
+        """Number of true rows of the truth table (among those matching `where`)."""
+        levels = sorted(self.manager.level(var) for var in self._variables)
+
+        def rank(u: int) -> int:
+            # How many of our variables come before node u
+            return bisect_left(levels, self.manager.node(u)[0])
+
+        counts: Dict[int, int] = {0: 0, 1: 1}
+        root = self._constrained(where)
+        stack = [root]
+        while stack:
+            u = stack[-1]
+            if u in counts:
+                stack.pop()
+                continue
+
+            _, low, high = self.manager.node(u)
+            missing = [child for child in (low, high) if child not in counts]
+            if missing:
+                stack.extend(missing)
+                continue
+
+            stack.pop()
+            counts[u] = sum(counts[child] << (rank(child) - rank(u) - 1) for child in (low, high))
+
+        return counts[root] << rank(root)
+
+    def cubes(self, **where: bool) -> Iterator[Dict[str, bool]]:
+        """Partial assignments covering the models; variables left out can take either value."""
+        names = {self.manager.level(var): var for var in self._variables}
+        stack: List[Tuple[int, Dict[str, bool]]] = [(self._constrained(where), {})]
+        while stack:
+            u, cube = stack.pop()
+            if u == 0:
+                continue
+            if u == 1:
+                yield cube
+                continue
+
+            level, low, high = self.manager.node(u)
+            stack.append((low, {**cube, names[level]: False}))
+            stack.append((high, {**cube, names[level]: True}))
+
+    def models(self, **where: bool) -> Iterator[Dict[str, bool]]:
+        """Every satisfying row as a full assignment, True before False like PExp's table."""
+        for cube in self.cubes(**where):
+            free = [var for var in self._variables if var not in cube]
+            for values in itertools.product((True, False), repeat=len(free)):
+                model = {**cube, **dict(zip(free, values))}
+                yield {var: model[var] for var in self._variables}
+
+    def first_model(self, **where: bool) -> Optional[Dict[str, bool]]:
+        return next(self.models(**where), None)
+
+    def where(self, **kwargs: bool) -> Iterator[Dict[str, bool]]:
+        """Satisfying rows that match `kwargs`."""
+        return self.models(**kwargs)
+
+    def __eq__(self, other: 'BExp') -> bool:
+        if not isinstance(other, BExp):
+            return NotImplemented
+        if other.manager is not self.manager:
+            other = BExp(other.expression, self.manager)
+        return self._root == other._root
+
+
 if __name__ == "__main__":
     exp0 = PExp("a&b-c|d").solve().show_table()
     e0 = PExp("a").solve().show_table()
     exp1 = PExp("memo|b-c").solve().show_table()
     print(exp0.where(b=1, c=0).to_markdown(), '\n')
     print(PExp("a-b&c-k|p^x").solve().where(x=1, c=0, b=1, a=1, p=0, k=1).to_markdown())
-    print(exp0 == exp1)
\ No newline at end of file
+    print(exp0 == exp1)
+    print(PackedPExp("a&b-c|d").solve().where(b=1, c=0).to_markdown(), '\n')
+    print(PackedPExp("a&b-c|d").solve() == PackedPExp("~(a&b)|c|d").solve())
+    pairs = list(zip("abcdefghijkl", "mnopqrstuvwx"))
+    big = PExpStream("(" + "|".join(f"{x}&{y}" for x, y in pairs) + ")&~z", processes=4)
+    print(big.count(), big.first_model(z=0))
+    print(BExp("a&b-c|d") == BExp("~(a&b)|c|d"), BExp("(" + "|".join(f"{x}&{y}" for x, y in pairs) + ")&~z").count())
\ No newline at end of file
@@ -1,3 +1,6 @@
+import time
+
+import numpy as np
 from PIL import Image
 
 
@@ -16,6 +19,40 @@ def decode_rle_to_rgb_image(input_file, output_image, width, height):
     image.save(output_image)
 
 
-decode_rle_to_rgb_image('i.txt', 'o.png', 1024, 1024)
+def decode_rle_to_array(input_file, width, height):
+    """Decode an `r g b count` run file into a height x width x 3 uint8 array."""
+    with open(input_file, 'r') as file:
+        try:
+            values = np.array(file.read().split(), dtype=np.int64)
+        except ValueError:
+            raise ValueError(f'{input_file} holds something other than integers') from None
+
+    if len(values) % 4:
+        raise ValueError(f'{input_file} holds {len(values)} numbers, expected whole `r g b count` runs')
+    runs = values.reshape(-1, 4)
+    if (runs[:, 3] < 0).any():
+        raise ValueError(f'{input_file} has a negative run length')
+    if ((runs[:, :3] < 0) | (runs[:, :3] > 255)).any():
+        raise ValueError(f'{input_file} has a color channel outside 0-255')
+
+    pixels = np.repeat(runs[:, :3].astype(np.uint8), runs[:, 3], axis=0)
+    if len(pixels) != width * height:
+        raise ValueError(f'{input_file} holds {len(pixels)} pixels, expected {width}x{height}')
+    return pixels.reshape(height, width, 3)
+
+
+def decode_rle_to_rgb_image_fast(input_file, output_image, width, height):
+    """decode_rle_to_rgb_image with the runs parsed and expanded by NumPy instead of per pixel tuples."""
+    Image.fromarray(decode_rle_to_array(input_file, width, height), 'RGB').save(output_image)
+
+
+def benchmark(input_file='i.txt', width=1024, height=1024, repeat=5):
+    for name, decode in (('tuples', decode_rle_to_rgb_image), ('numpy', decode_rle_to_rgb_image_fast)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            decode(input_file, 'o.png', width, height)
+        print(f'{name:<8}{(time.perf_counter() - start) * 1000 / repeat:8.1f} ms')
 
 
+if __name__ == '__main__':
+    decode_rle_to_rgb_image_fast('i.txt', 'o.png', 1024, 1024)
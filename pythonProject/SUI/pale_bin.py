@@ -0,0 +1,224 @@
+import struct
+
+import numpy as np
+import zstandard
+from PIL import Image
+
+
+# Layout written by PaleImage::save in the pale_image crate, zstd compressed as one stream:
+#
+#   u32 width, u32 height              (little-endian)
+#   height x [u32 run count, run count x (u16 length, u16 rgb565 color)]
+#
+# Every row is its own list of runs, so rows can be decoded one at a time.
+
+HEADER = struct.Struct('<II')
+ROW_LENGTH = struct.Struct('<I')
+RUN = np.dtype([('count', '<u2'), ('color', '<u2')])
+
+
+def rgb565_to_rgb(colors):
+    """Expand an array of RGB565 colors to uint8 RGB triples, the same way EncodedPixelsCompact::color_rgb does."""
+    colors = np.asarray(colors, dtype=np.uint16)
+    rgb = np.empty(colors.shape + (3,), dtype=np.uint8)
+    rgb[..., 0] = ((colors >> 11) & 0x1F) << 3
+    rgb[..., 1] = ((colors >> 5) & 0x3F) << 2
+    rgb[..., 2] = (colors & 0x1F) << 3
+    return rgb
+
+
+def expand_runs(runs, start=0, stop=None):
+    """Pixels [start, stop) of a row of runs as a (stop - start) x 3 uint8 array."""
+    ends = np.cumsum(runs['count'], dtype=np.int64)
+    stop = int(ends[-1]) if stop is None else stop
+    if stop <= start:
+        return np.empty((0, 3), dtype=np.uint8)
+
+    first = np.searchsorted(ends, start, side='right')
+    last = np.searchsorted(ends, stop - 1, side='right')
+    counts = runs['count'][first:last + 1].astype(np.int64)
+    # Cut the first and last runs down to the requested columns
+    counts[0] = min(ends[first], stop) - start
+    if last > first:
+        counts[-1] = stop - (ends[last] - runs['count'][last])
+    return np.repeat(rgb565_to_rgb(runs['color'][first:last + 1]), counts, axis=0)
+
+
+def rgb_to_rgb565(rgb):
+    """Pack uint8 RGB triples into RGB565, the same way EncodedPixelsCompact::new does."""
+    rgb = np.asarray(rgb, dtype=np.uint16)
+    return ((rgb[..., 0] >> 3) << 11) | ((rgb[..., 1] >> 2) << 5) | (rgb[..., 2] >> 3)
+
+
+def _run_starts(row, margin):
+    """Where PaleImage::compress starts a new run in a width x 3 int16 row."""
+    width = len(row)
+    if margin <= 0:
+        # Only exact repeats join a run, so a run starts wherever the color changes
+        return np.flatnonzero(np.r_[True, np.any(row[1:] != row[:-1], axis=1)])
+
+    starts = []
+    x = 0
+    window = 16
+    while x < width:
+        starts.append(x)
+        # A run keeps going while pixels stay within margin of its first pixel; look ahead in
+        # growing windows so long runs cost a few vectorized checks instead of one per pixel
+        end = x + 1
+        while end < width:
+            stop = min(end + window, width)
+            far = np.flatnonzero(np.abs(row[end:stop] - row[x]).sum(axis=1) > margin)
+            if len(far):
+                end += far[0]
+                break
+            end = stop
+            window *= 2
+        window = max(16, (end - x) * 2)
+        x = end
+    return np.array(starts, dtype=np.int64)
+
+
+def compress(pixels, margin):
+    """
+    Python port of PaleImage::compress: the runs of every row of a height x width x 3 uint8 image.
+
+    A run grows while the next pixel is within `margin` (sum of absolute channel differences)
+    of the run's first pixel and is stored as its pixel count and its average color in RGB565.
+    Runs are capped at 65535 pixels since the file stores counts as u16.
+    """
+    rows = []
+    for row in np.asarray(pixels, dtype=np.int16):
+        starts = _run_starts(row, margin)
+        counts = np.diff(np.r_[starts, len(row)])
+        # u16 counts in the file: split any longer run
+        while counts.max(initial=0) > 0xFFFF:
+            long = np.flatnonzero(counts > 0xFFFF)[0]
+            starts = np.insert(starts, long + 1, starts[long] + 0xFFFF)
+            counts = np.diff(np.r_[starts, len(row)])
+
+        sums = np.add.reduceat(row.astype(np.uint32), starts, axis=0)
+        runs = np.empty(len(starts), dtype=RUN)
+        runs['count'] = counts
+        runs['color'] = rgb_to_rgb565(sums // counts[:, None].astype(np.uint32))
+        rows.append(runs)
+    return rows
+
+
+def save(path, width, height, rows, level=22):
+    """Write runs from compress() in PaleImage::save's format; level 22 is what the Rust side uses."""
+    compressor = zstandard.ZstdCompressor(level=level)
+    with open(path, 'wb') as file, compressor.stream_writer(file) as writer:
+        writer.write(HEADER.pack(width, height))
+        for runs in rows:
+            writer.write(ROW_LENGTH.pack(len(runs)))
+            writer.write(runs.astype(RUN, copy=False).tobytes())
+
+
+class PaleBin:
+    """
+    Lazy reader for pale_image .bin files.
+
+    The zstd stream is only decompressed as far as the furthest row asked for, so
+    reading the top rows or a tile near the top never touches the rest of the file.
+    The runs of every row passed on the way are kept (they are much smaller than the
+    pixels they expand to), so going back to an earlier row costs no decompression.
+    """
+
+    def __init__(self, path, cache_runs=True):
+        self.path = path
+        self.cache_runs = cache_runs
+        self._file = open(path, 'rb')
+        self._reader = zstandard.ZstdDecompressor().stream_reader(self._file)
+        self.width, self.height = HEADER.unpack(self._read(HEADER.size))
+        self._runs = []  # runs of rows 0.._next_row - 1, when cached
+        self._next_row = 0
+
+    def _read(self, size):
+        chunks = []
+        while size:
+            chunk = self._reader.read(size)
+            if not chunk:
+                raise EOFError(f'{self.path} ends before its last row')
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def _read_row(self):
+        length, = ROW_LENGTH.unpack(self._read(ROW_LENGTH.size))
+        runs = np.frombuffer(self._read(length * RUN.itemsize), dtype=RUN)
+        self._next_row += 1
+        if self.cache_runs:
+            self._runs.append(runs)
+        return runs
+
+    def _rewind(self):
+        self._reader.close()
+        self._file = open(self.path, 'rb')
+        self._reader = zstandard.ZstdDecompressor().stream_reader(self._file)
+        self._read(HEADER.size)
+        self._next_row = 0
+
+    def runs(self, y):
+        """Structured (count, color) array of row y."""
+        if not 0 <= y < self.height:
+            raise IndexError(f'Row {y} out of range for height {self.height}')
+        if self.cache_runs and y < len(self._runs):
+            return self._runs[y]
+        if y < self._next_row:
+            self._rewind()
+        while self._next_row < y:
+            self._read_row()
+        return self._read_row()
+
+    def row(self, y):
+        """Row y as a width x 3 uint8 array."""
+        return expand_runs(self.runs(y))
+
+    def tile(self, x0, y0, x1, y1):
+        """Pixels in columns [x0, x1) and rows [y0, y1) as a (y1 - y0) x (x1 - x0) x 3 uint8 array."""
+        x0, x1 = max(x0, 0), min(x1, self.width)
+        y0, y1 = max(y0, 0), min(y1, self.height)
+        tile = np.empty((max(y1 - y0, 0), max(x1 - x0, 0), 3), dtype=np.uint8)
+        for y in range(y0, y1):
+            tile[y - y0] = expand_runs(self.runs(y), x0, x1)
+        return tile
+
+    def iter_rows(self):
+        """Stream every row in order, with a reader of its own so nothing gets cached."""
+        with PaleBin(self.path, cache_runs=False) as reader:
+            for y in range(reader.height):
+                yield reader.row(y)
+
+    def decode(self):
+        """The whole image as a height x width x 3 uint8 array, expanded in one np.repeat."""
+        runs = np.concatenate([self.runs(y) for y in range(self.height)])
+        pixels = np.repeat(rgb565_to_rgb(runs['color']), runs['count'].astype(np.int64), axis=0)
+        return pixels.reshape(self.height, self.width, 3)
+
+    def to_image(self):
+        return Image.fromarray(self.decode(), 'RGB')
+
+    def close(self):
+        self._reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+if __name__ == '__main__':
+    import time
+
+    start = time.perf_counter()
+    with PaleBin('../../pale_image/images/compression_germany2.bin') as image:
+        top = image.tile(0, 0, 64, 64)
+        print(f'{image.width}x{image.height}, 64x64 tile in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        start = time.perf_counter()
+        pixels = image.decode()
+        print(f'full decode in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    reference = np.asarray(Image.open('../../pale_image/images/new_germany2.png').convert('RGB'))
+    print('matches new_germany2.png:', np.array_equal(pixels, reference))
@@ -1,25 +1,54 @@
 from collections import Counter
+from functools import lru_cache
 import glob
+import os
 import string
 import multiprocessing
-import json
+import time
+from typing import Iterable, Iterator
 
 import nltk
 from icecream import ic
 
+import PaleIO
+
 
 stemmer = nltk.stem.snowball.SnowballStemmer("english")
 
+# Filled once per process by init_worker, so no token ever rebuilds the nltk list
+STOPWORDS: frozenset[str] = frozenset()
+PUNCTUATION: frozenset[str] = frozenset(string.punctuation)
+
+
+def load_stopwords(language: str = 'english') -> frozenset[str]:
+    return frozenset(nltk.corpus.stopwords.words(language))
+
+
+def init_worker(stopwords: frozenset[str]) -> None:
+    global STOPWORDS
+    STOPWORDS = stopwords
+
+
+@lru_cache(maxsize=1 << 16)
+def stem(word: str) -> str:
+    return stemmer.stem(word)
+
+
+def keep(token: str) -> bool:
+    return "'" not in token and token not in PUNCTUATION and token.lower() not in STOPWORDS
+
+
+def get_word_count(path: str) -> tuple[str, Counter]:
+    if not STOPWORDS:
+        init_worker(load_stopwords())
 
-def get_word_count(path: str) -> dict[str: int]:
     with open(path) as file:
+        # Drop stopwords and punctuation first so only the kept tokens get stemmed
         return path, Counter(
-            filter(
-                lambda x: "'" not in x
-                          and x not in string.punctuation
-                          and x not in nltk.corpus.stopwords.words('english'),
-                map(
-                    stemmer.stem,
+            map(
+                stem,
+                filter(
+                    keep,
                     nltk.tokenize.word_tokenize(
                         file.read()
                     )
@@ -28,9 +57,34 @@ def get_word_count(path: str) -> dict[str: int]:
         )
 
 
-def save(path: str, data: dict) -> None:
-    with open(path, 'w') as j_file:
-        json.dump(data, j_file, indent=4)
+def process(paths: Iterable[str], processes: int = None, chunksize: int = 4,
+            stats: dict = None) -> Iterator[tuple[str, Counter]]:
+    """
+    Count the stemmed words of every file in a process pool, yielding (path, counts) as files finish.
+
+    The stopwords are loaded once here and handed to every worker's initializer, so a missing
+    nltk corpus raises in the caller instead of failing in each worker the pool keeps respawning. `chunksize` files are sent to a
+    worker at a time; raise it when there are many small files. If given, `stats` is filled
+    with files, bytes, tokens, seconds and the matching per second rates.
+    """
+    paths = list(paths)
+    stopwords = load_stopwords()
+    stats = {} if stats is None else stats
+    stats.update(files=0, bytes=0, tokens=0, seconds=0.0)
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(stopwords,)) as pool:
+        for path, count in pool.imap_unordered(get_word_count, paths, chunksize=chunksize):
+            stats['files'] += 1
+            stats['bytes'] += os.path.getsize(path)
+            stats['tokens'] += sum(count.values())
+            yield path, count
+
+    stats['seconds'] = time.perf_counter() - start
+    elapsed = max(stats['seconds'], 1e-9)
+    stats['files_per_s'] = stats['files'] / elapsed
+    stats['tokens_per_s'] = stats['tokens'] / elapsed
+    stats['mb_per_s'] = stats['bytes'] / elapsed / 1e6
 
 
 if __name__ == '__main__':
@@ -38,15 +92,13 @@ if __name__ == '__main__':
     glob_folder = 'Modern Talking'
     songs_list = glob.glob(f'{glob_folder}/*.txt')
 
-    with multiprocessing.Pool() as pool:
-        riz = pool.imap_unordered(get_word_count, songs_list)
-
-        for ind, (name, count) in enumerate(riz):
-            name = name.removeprefix('Modern Talking\\')[:-4]
-            ic(name, count)
-            out = {
+    stats = {}
+    with PaleIO.NDJSONWriter(f'{glob_folder} (Processed).ndjson', batch_size=500) as writer:
+        for ind, (path, count) in enumerate(process(songs_list, stats=stats)):
+            writer.write({
                 'ID': ind,
-                'Name': name,
+                'Name': PaleIO.song_name(path),
                 'Words': dict(count)
-            }
-            save(f'{glob_folder} (Processed)\\{name}.json', out)
+            })
+
+    ic(stats, writer.records)
@@ -0,0 +1,59 @@
+import threading
+
+import mongomock
+import pymongo
+
+from LoadPale import bulk_load
+
+
+class FakeCollection:
+    """Records what bulk_load asks of a collection, and how many batches overlap."""
+
+    def __init__(self):
+        self.indexes = []
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._calls = 0
+        self._lock = threading.Lock()
+        self._first_pair = threading.Barrier(2, timeout=5)
+
+    def create_index(self, keys):
+        self.indexes.append(keys)
+
+    def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        with self._lock:
+            self._calls += 1
+            first_pair = self._calls <= 2
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if first_pair:
+            self._first_pair.wait()  # The first two batches only finish together, so they must overlap
+        with self._lock:
+            self.in_flight -= 1
+            self.batches.append(len(documents))
+
+
+def songs(n):
+    return ({'ID': i, 'Name': f'Song {i}', 'Words': {'love': i}} for i in range(n))
+
+
+def test_batches_and_indexes_with_workers():
+    collection = FakeCollection()
+    report = bulk_load(collection, songs(2500), batch_size=1000, workers=2)
+
+    assert collection.indexes == [[('Name', pymongo.ASCENDING)], [('ID', pymongo.ASCENDING)]]
+    assert sorted(collection.batches) == [500, 1000, 1000]
+    assert collection.max_in_flight == 2
+    assert report['documents'] == 2500 and report['batches'] == 3
+
+
+def test_bulk_load_into_mongomock():
+    collection = mongomock.MongoClient().SONGS.Modern_Talking
+    report = bulk_load(collection, songs(250), batch_size=100)
+
+    assert report['documents'] == 250 and report['batches'] == 3
+    assert collection.count_documents({}) == 250
+    assert {'Name_1', 'ID_1'} <= set(collection.index_information())
+    assert collection.find_one({'ID': 42})['Name'] == 'Song 42'
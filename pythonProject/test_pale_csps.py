@@ -0,0 +1,23 @@
+from Pale_CSPs import Node, Solver, lt
+
+
+def same_parity(x, y):
+    return (x + y) % 2 == 0
+
+
+def test_ac3_accepts_any_binary_constraint():
+    for vectorize in (False, True):
+        a, b, c = Node('A', [1, 2, 3]), Node('B', [2, 4]), Node('C', [1, 3, 5])
+        assert Node.ac3([[a, b, same_parity], [b, c, lt]], vectorize=vectorize)
+        assert a.result_domain == [2] and b.result_domain == [2, 4] and c.result_domain == [3, 5]
+
+    a, b = Node('A', [1, 3]), Node('B', [2, 4])
+    assert not Node.ac3([[a, b, same_parity]], vectorize=False)
+
+
+def test_solver_and_ac3_agree_on_custom_constraints():
+    a, b = Node('A', [1, 2, 3, 4]), Node('B', [1, 2])
+    constraints = [[a, b, lambda x, y: x == 2 * y]]
+    assert Node.ac3(constraints)
+    assert a.result_domain == [2, 4] and b.result_domain == [1, 2]
+    assert Solver(constraints).count() == 2
@@ -0,0 +1,57 @@
+import itertools
+import string
+
+from Paleositional import BExp, PackedPExp, PExp, PExpStream
+
+
+def names(prefix, n):
+    letters = (''.join(chars) for chars in itertools.product(string.ascii_lowercase, repeat=2))
+    return [prefix + name for name in itertools.islice(letters, n)]
+
+
+def reachable(exp):
+    seen, stack = set(), [exp.root]
+    while stack:
+        u = stack.pop()
+        if u not in seen:
+            seen.add(u)
+            stack.extend(exp.manager.node(u)[1:] if u > 1 else ())
+    return len(seen)
+
+
+def test_bexp_matches_truth_table():
+    for expression in ("a&b-c|d", "~(a&b)|c|d", "a^b=c", "memo|b-c"):
+        table = PExp(expression).solve()
+        assert BExp(expression).count() == int(table.final_answer().sum())
+
+
+def test_bexp_pairs_stay_small():
+    n = 120
+    pairs = zip(names('p', n), names('q', n))
+    exp = BExp("|".join(f"({x}&{y})" for x, y in pairs))
+
+    # One node per variable plus the two leaves; alphabetical levels need 2 ** n
+    assert reachable(exp) == 2 * n + 2
+    assert exp.count() == 4 ** n - 3 ** n
+    assert exp.vars() == sorted(exp.vars())
+    model = exp.first_model(paa=False, qaa=True)
+    assert model is not None and model['paa'] is False
+
+
+def test_stream_matches_packed_table():
+    expression = "(a&b)|(c&d)|~e"
+    packed = PackedPExp(expression).solve()
+    stream = PExpStream(expression, block_rows=8)
+    assert stream.count() == packed.count()
+    assert stream.count(e=1, a=0) == BExp(expression).count(e=True, a=False)
+    assert PExpStream(expression, block_rows=8, processes=2).count() == packed.count()
+
+    model = stream.first_model(e=1)
+    assert model is not None and model["e"] and BExp(expression).count(**model) == 1
+
+
+def test_packed_equality_needs_the_same_variables():
+    assert PackedPExp("a&b-c|d").solve() == PackedPExp("~(a&b)|c|d").solve()
+    assert not PackedPExp("a|~a").solve() == PackedPExp("a&(b|~b)").solve()
+    assert not PackedPExp("a|~a").solve() == PackedPExp("b|~b").solve()
+    assert not PExp("a|~a").solve() == PExp("a&(b|~b)").solve()
@@ -0,0 +1,40 @@
+import nltk
+import pytest
+
+import TransPale
+
+
+class Stopwords:
+    """Stand-in for nltk's stopwords corpus, which may not be downloaded."""
+
+    def __init__(self, words=None):
+        self._words = words
+
+    def words(self, language):
+        if self._words is None:
+            raise LookupError('Resource stopwords not found.')
+        return self._words
+
+
+def test_process_counts_stems(tmp_path, monkeypatch):
+    monkeypatch.setattr(nltk.corpus, 'stopwords', Stopwords(['the', 'and']))
+    monkeypatch.setattr(nltk.tokenize, 'word_tokenize', str.split)
+    paths = []
+    for i, text in enumerate(('the loving and the loved', 'dancing dancers')):
+        path = tmp_path / f'{i}.txt'
+        path.write_text(text)
+        paths.append(str(path))
+
+    stats = {}
+    counts = dict(TransPale.process(paths, processes=2, stats=stats))
+    assert counts[paths[0]] == {'love': 2}
+    assert counts[paths[1]] == {'danc': 1, 'dancer': 1}
+    assert stats['files'] == 2 and stats['tokens'] == 4
+
+
+def test_process_raises_when_stopwords_are_missing(tmp_path, monkeypatch):
+    monkeypatch.setattr(nltk.corpus, 'stopwords', Stopwords())
+    path = tmp_path / 'song.txt'
+    path.write_text('la la la')
+    with pytest.raises(LookupError):
+        list(TransPale.process([str(path)], processes=2))